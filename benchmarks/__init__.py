@@ -0,0 +1 @@
+"""benchmarks of modelo720."""
@@ -0,0 +1,232 @@
+"""synthetic broker exports for the modelo720 benchmarks.
+
+Writes, for a given number of holdings, the Degiro and IBKR portfolio exports of two consecutive years and
+the IBKR activity statement of the last one, named like real exports so `modelo720 build` can read them:
+
+    python -m benchmarks.generate datasets/bench 100000
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+CURRENCIES = ["EUR", "EUR", "EUR", "USD", "USD", "GBP", "CHF", "SEK", "DKK", "JPY", "CAD"]
+COUNTRIES = {"EUR": "IE", "USD": "US", "GBP": "GB", "CHF": "CH", "SEK": "SE", "DKK": "DK", "JPY": "JP", "CAD": "CA"}
+WORDS = ["GLOBAL", "TECH", "ENERGY", "BANK", "PHARMA", "MOTORS", "RETAIL", "MINING", "FOODS", "TELECOM"]
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+# Share of the holdings of each kind
+OPTION_SHARE = 0.02
+NULL_ISIN_SHARE = 0.01
+KEPT_SHARE = 0.8
+SOLD_SHARE = 0.1
+
+
+def isin_check_digit(body: str) -> str:
+    """Computes the check digit of the first 11 characters of an ISIN.
+
+    Args:
+        body (str): country code and national security identifier
+
+    Returns:
+        str: check digit
+    """
+    digits = "".join(str(int(char, 36)) for char in body)
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit) * (2 if position % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return str((10 - total % 10) % 10)
+
+
+def _spanish(value: float) -> str:
+    """Formats a number like the Spanish Degiro export."""
+    return f"{value:.2f}".replace(".", ",")
+
+
+def _quote(value: str) -> str:
+    """Quotes a CSV field."""
+    return f'"{value}"'
+
+
+class Universe:
+    """Instruments of the synthetic portfolios."""
+
+    def __init__(self, rows: int, seed: int = 0):
+        """Draws the instruments.
+
+        Args:
+            rows (int): number of holdings of each portfolio
+            seed (int, optional): random seed. Defaults to 0.
+        """
+        self.random = random.Random(seed)
+        self.instruments = [self._instrument(i) for i in range(rows * 2)]
+
+    def _instrument(self, i: int) -> dict:
+        rng = self.random
+        currency = rng.choice(CURRENCIES)
+        symbol = f"S{i:07d}"
+        roll = rng.random()
+        if roll < OPTION_SHARE:
+            underlying = symbol[-5:]
+            strike = rng.randint(5, 500)
+            product = f"X{underlying} {rng.randint(1, 28):02d}{rng.choice(MONTHS)}25 {strike} {rng.choice('CP')}"
+            return {"symbol": symbol, "product": product, "isin": "", "currency": currency, "price": strike / 10}
+        if roll < OPTION_SHARE + NULL_ISIN_SHARE:
+            product = f"CASH & CASH FUND {i} ({currency})"
+            return {"symbol": symbol, "product": product, "isin": "", "currency": currency, "price": 1.0}
+
+        body = f"{COUNTRIES[currency]}{i:09d}"
+        product = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i} CORP"
+        price = round(rng.lognormvariate(4, 1), 2)
+        return {
+            "symbol": symbol,
+            "product": product,
+            "isin": body + isin_check_digit(body),
+            "currency": currency,
+            "price": price,
+        }
+
+    def portfolios(self, rows: int) -> tuple[list[dict], list[dict], list[dict]]:
+        """Splits the instruments into the holdings of two consecutive years.
+
+        Args:
+            rows (int): number of holdings of each portfolio
+
+        Returns:
+            tuple[list[dict], list[dict], list[dict]]: previous holdings, current holdings, and previous holdings
+                sold during the current year.
+        """
+        kept = int(rows * KEPT_SHARE)
+        previous = self.instruments[:rows]
+        current = self.instruments[:kept] + self.instruments[rows : 2 * rows - kept]
+        sold = previous[kept : kept + int(rows * SOLD_SHARE)]
+        return previous, current, sold
+
+
+def write_degiro(file_path: Path, holdings: list[dict], rng: random.Random) -> None:
+    """Writes a Degiro portfolio export."""
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("Producto,Symbol/ISIN,Cantidad,Precio de,Valor local,Valor en EUR\n")
+        for holding in holdings:
+            amount = rng.randint(1, 500)
+            local_value = amount * holding["price"]
+            eur_value = local_value * rng.uniform(0.6, 1.2) if holding["currency"] != "EUR" else local_value
+            f.write(
+                f"{_quote(holding['product'])},{holding['isin']},{amount},{_quote(_spanish(holding['price']))},"
+                f"{_quote(holding['currency'] + ' ' + _spanish(local_value))},{_quote(_spanish(eur_value))}\n"
+            )
+
+
+def write_ibkr(file_path: Path, holdings: list[dict], rng: random.Random) -> None:
+    """Writes an IBKR Flex open positions export."""
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write('"Description","ISIN","Quantity","PositionValue","CurrencyPrimary"\n')
+        for holding in holdings:
+            amount = rng.randint(1, 500)
+            fields = [
+                holding["product"],
+                holding["isin"],
+                amount,
+                round(amount * holding["price"], 2),
+                holding["currency"],
+            ]
+            f.write(",".join(_quote(str(field)) for field in fields) + "\n")
+
+
+def write_activity(file_path: Path, year: int, bought: list[dict], sold: list[dict], rng: random.Random) -> None:
+    """Writes an IBKR activity statement with stock and forex trades and the instruments traded."""
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("Statement,Header,Field Name,Field Value\n")
+        f.write("Statement,Data,BrokerName,Interactive Brokers Ireland Limited\n")
+        f.write(f'Statement,Data,Period,"January 1, {year} - December 31, {year}"\n')
+
+        f.write(
+            "Trades,Header,DataDiscriminator,Asset Category,Currency,Symbol,Date/Time,Quantity,T. Price,C. Price,"
+            "Proceeds,Comm/Fee,Basis,Realized P/L,MTM P/L,Code\n"
+        )
+        for holding, side in [(holding, 1) for holding in bought] + [(holding, -1) for holding in sold]:
+            trades = []
+            for _ in range(rng.randint(1, 3)):
+                quantity = side * rng.randint(1, 100)
+                price = holding["price"]
+                proceeds = round(-quantity * price, 2)
+                when = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}, {rng.randint(9, 16):02d}:30:00"
+                trades.append((quantity, proceeds))
+                f.write(
+                    f'Trades,Data,Order,Stocks,{holding["currency"]},{holding["symbol"]},"{when}",{quantity},'
+                    f"{price},{price},{proceeds},-1,{-proceeds},0,0,{'O' if side > 0 else 'C'}\n"
+                )
+            quantity, proceeds = sum(t[0] for t in trades), round(sum(t[1] for t in trades), 2)
+            f.write(
+                f"Trades,SubTotal,,Stocks,{holding['currency']},{holding['symbol']},,{quantity},,,{proceeds},"
+                f"{-len(trades)},{-proceeds},0,0,\n"
+            )
+        f.write("Trades,Total,,Stocks,EUR,,,,,,0,0,0,0,0,\n")
+
+        f.write(
+            "Trades,Header,DataDiscriminator,Asset Category,Currency,Symbol,Date/Time,Quantity,T. Price,Proceeds,"
+            "Comm in EUR,MTM in EUR,Code\n"
+        )
+        for _ in range(max(1, len(sold) // 10)):
+            f.write(f'Trades,Data,Order,Forex,USD,EUR.USD,"{year}-06-03, 10:00:00",1000,1.08,-1080,-2,0,\n')
+
+        f.write(
+            "Financial Instrument Information,Header,Asset Category,Symbol,Description,Conid,Security ID,"
+            "Listing Exch,Multiplier,Type,Code\n"
+        )
+        for conid, holding in enumerate(bought + sold):
+            f.write(
+                f"Financial Instrument Information,Data,Stocks,{holding['symbol']},{_quote(holding['product'])},"
+                f"{conid},{holding['isin']},NASDAQ,1,COMMON,\n"
+            )
+
+
+def generate_dataset(output_dir: str | Path, rows: int, year: int = 2024, seed: int = 0) -> dict[str, Path]:
+    """Writes the synthetic exports of two consecutive years.
+
+    Args:
+        output_dir (Union[str, Path]): directory of the exports
+        rows (int): number of holdings of each portfolio
+        year (int, optional): current year. Defaults to 2024.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict[str, Path]: file path of each export, keyed on its kind.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    universe = Universe(rows, seed)
+    rng = random.Random(seed + 1)
+    previous, current, sold = universe.portfolios(rows)
+    bought = current[int(rows * KEPT_SHARE) :]
+
+    paths = {
+        "degiro_prev": output_dir / f"Portfolio{year - 1}.csv",
+        "degiro": output_dir / f"Portfolio{year}.csv",
+        "ibkr_prev": output_dir / f"Portfolio{year - 1}_IBKR.csv",
+        "ibkr": output_dir / f"Portfolio{year}_IBKR.csv",
+        "activity": output_dir / f"Activity{year}_IBKR.csv",
+    }
+    write_degiro(paths["degiro_prev"], previous, rng)
+    write_degiro(paths["degiro"], current, rng)
+    write_ibkr(paths["ibkr_prev"], previous, rng)
+    write_ibkr(paths["ibkr"], current, rng)
+    write_activity(paths["activity"], year, bought, sold, rng)
+    return paths
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Writes a synthetic dataset from the command line."""
+    parser = argparse.ArgumentParser(description="Write synthetic broker exports for the modelo720 benchmarks.")
+    parser.add_argument("output_dir", help="directory of the exports")
+    parser.add_argument("rows", type=int, help="number of holdings of each portfolio")
+    parser.add_argument("--year", type=int, default=2024, help="current year")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+    for kind, path in generate_dataset(args.output_dir, args.rows, args.year, args.seed).items():
+        print(f"{kind}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""import-time budget of modelo720.
+
+Imports each entry point in a fresh interpreter with `python -X importtime`, prints the slowest modules
+and fails when an import exceeds its budget or pulls in a heavy dependency that should load lazily:
+
+    python -m benchmarks.importtime --top 15
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+# Entry points and their import budget in milliseconds
+BUDGETS_MS = {"modelo720": 100, "modelo720.cli": 150}
+# Dependencies only imported when the pipeline first needs them
+LAZY_MODULES = ["polars", "pandas", "pydantic", "currency_converter"]
+
+
+def import_times(module: str) -> list[dict]:
+    """Imports a module in a fresh interpreter and parses the `-X importtime` report.
+
+    Args:
+        module (str): module to import
+
+    Returns:
+        list[dict]: self and cumulative import time in microseconds of every imported module, in import order.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT_DIR,
+    )
+    times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return times
+
+
+def check(module: str, budget_ms: float, top: int) -> tuple[dict, list[str]]:
+    """Reports the import time of an entry point and checks it against its budget.
+
+    Args:
+        module (str): entry point
+        budget_ms (float): import budget in milliseconds
+        top (int): number of slowest modules to print
+
+    Returns:
+        tuple[dict, list[str]]: report of the entry point, and the budget violations.
+    """
+    times = import_times(module)
+    total_ms = next(t["cumulative_us"] for t in times if t["module"] == module) / 1000
+    imported = {t["module"].split(".")[0] for t in times}
+    eager = [name for name in LAZY_MODULES if name in imported]
+
+    print(f"{module}: {total_ms:.1f} ms (budget {budget_ms} ms)")
+    for t in sorted(times, key=lambda t: t["cumulative_us"], reverse=True)[:top]:
+        print(f"  {t['cumulative_us'] / 1000:8.1f} ms  {t['self_us'] / 1000:8.1f} ms  {t['module']}")
+
+    violations = [f"{module} imported {name} eagerly" for name in eager]
+    if total_ms > budget_ms:
+        violations.append(f"{module} took {total_ms:.1f} ms to import, over its {budget_ms} ms budget")
+    report = {"module": module, "total_ms": round(total_ms, 3), "budget_ms": budget_ms, "eager": eager, "times": times}
+    return report, violations
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Checks the import budgets from the command line."""
+    parser = argparse.ArgumentParser(description="Report and check the import time of modelo720.")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest modules to print")
+    parser.add_argument("--output", help="JSON file to write the full report to")
+    args = parser.parse_args(argv)
+
+    reports, violations = [], []
+    for module, budget_ms in BUDGETS_MS.items():
+        report, module_violations = check(module, budget_ms, args.top)
+        reports.append(report)
+        violations.extend(module_violations)
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2))
+
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""scale benchmarks of the modelo720 pipeline.
+
+Times every stage of the pipeline on synthetic datasets and records the peak resident memory of each
+stage, then stores the results as JSON. Passing a previous results file prints the ratio of each timing:
+
+    python -m benchmarks.run --sizes 1000 100000 --output bench.json --compare baseline.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+
+from modelo720 import DegiroReader, FileConfig, GlobalCompute, IbkrActivity, IbkrReader
+
+from .generate import generate_dataset
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+YEAR = 2024
+
+
+def _rss() -> int:
+    """Returns the resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is the peak of the whole process, in KiB on Linux and bytes on macOS
+        scale = 1 if platform.system() == "Darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class PeakMemory:
+    """Samples the resident memory of the process in a background thread while a stage runs."""
+
+    def __init__(self, interval: float = 0.005):
+        """Initializes the sampler.
+
+        Args:
+            interval (float, optional): seconds between samples. Defaults to 5 ms.
+        """
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakMemory":
+        self.peak = _rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+
+def measure(stage: str, size: int, func: Callable[[], object]) -> dict:
+    """Runs a stage, timing it and recording its peak resident memory.
+
+    Args:
+        stage (str): name of the stage
+        size (int): number of holdings of the dataset
+        func (Callable[[], object]): stage to run
+
+    Returns:
+        dict: result of the stage
+    """
+    before = _rss()
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+    result = {
+        "stage": stage,
+        "size": size,
+        "seconds": round(seconds, 6),
+        "peak_rss_mb": round(memory.peak / 2**20, 1),
+        "delta_rss_mb": round((memory.peak - before) / 2**20, 1),
+    }
+    print(f"{size:>9} {stage:<28} {seconds:9.3f}s {result['peak_rss_mb']:9.1f} MiB")
+    return result
+
+
+def run_size(data_dir: Path, size: int) -> list[dict]:
+    """Benchmarks every stage of the pipeline on a dataset, generating it when missing.
+
+    Args:
+        data_dir (Path): directory of the datasets
+        size (int): number of holdings of the dataset
+
+    Returns:
+        list[dict]: result of each stage
+    """
+    directory = data_dir / str(size)
+    paths = {
+        "degiro_prev": directory / f"Portfolio{YEAR - 1}.csv",
+        "degiro": directory / f"Portfolio{YEAR}.csv",
+        "ibkr_prev": directory / f"Portfolio{YEAR - 1}_IBKR.csv",
+        "ibkr": directory / f"Portfolio{YEAR}_IBKR.csv",
+        "activity": directory / f"Activity{YEAR}_IBKR.csv",
+    }
+    results = []
+    if not all(path.exists() for path in paths.values()):
+        results.append(measure("generate", size, lambda: generate_dataset(directory, size, YEAR)))
+
+    configs = [
+        FileConfig(paths["ibkr"], "ibkr", True, YEAR, paths["activity"]),
+        FileConfig(paths["degiro"], "degiro", True, YEAR),
+    ]
+    prev_configs = [
+        FileConfig(paths["ibkr_prev"], "ibkr", True, YEAR - 1),
+        FileConfig(paths["degiro_prev"], "degiro", True, YEAR - 1),
+    ]
+    compute: list[GlobalCompute] = []
+    stages = [
+        ("degiro_reader", lambda: DegiroReader(paths["degiro"], use_cache=False).data),
+        ("ibkr_reader", lambda: IbkrReader(paths["ibkr"], YEAR, use_cache=False).data),
+        ("activity_exit_data", lambda: IbkrActivity(paths["activity"], YEAR, use_cache=False).exit_data),
+        ("global_compute", lambda: compute.append(GlobalCompute(configs=configs, prev_configs=prev_configs))),
+        ("compute_difference", lambda: compute[0].compute_difference()),
+        ("generate_financial_record", lambda: compute[0].generate_financial_record()),
+        ("write_financial_record", lambda: compute[0].write_financial_record(io.BytesIO(), with_previous=True)),
+    ]
+    for stage, func in stages:
+        results.append(measure(stage, size, func))
+    return results
+
+
+def _metadata() -> dict:
+    """Returns the environment of the run."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: list[dict], baseline_path: str | Path) -> None:
+    """Prints the timing ratio of each stage against a previous run.
+
+    Args:
+        results (list[dict]): results of the current run
+        baseline_path (Union[str, Path]): results file of the previous run
+    """
+    baseline = {(r["stage"], r["size"]): r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result["stage"], result["size"]))
+        if previous is None or result["stage"] == "generate":
+            continue
+        ratio = result["seconds"] / previous["seconds"] if previous["seconds"] else float("inf")
+        print(
+            f"{result['size']:>9} {result['stage']:<28} {previous['seconds']:9.3f}s -> "
+            f"{result['seconds']:9.3f}s x{ratio:.2f}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Runs the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the modelo720 pipeline on synthetic datasets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of holdings")
+    parser.add_argument("--data-dir", default="benchmarks/data", help="directory of the generated datasets")
+    parser.add_argument("--output", default="benchmarks/results.json", help="results file to write")
+    parser.add_argument("--compare", help="results file of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>9} {'stage':<28} {'time':>10} {'peak RSS':>13}")
+    results = [result for size in args.sizes for result in run_size(Path(args.data_dir), size)]
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).write_text(json.dumps({"metadata": _metadata(), "results": results}, indent=2))
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,23 @@
 """modelo720 __ini__.py."""
 
-from modelo720.degiro import DegiroReader
-from modelo720.ibkr import IbkrActivity, IbkrReader
-from modelo720.model import FileConfig, GlobalCompute
+from typing import TYPE_CHECKING
+
+from modelo720._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from modelo720.degiro import DegiroReader
+    from modelo720.ibkr import IbkrActivity, IbkrReader
+    from modelo720.model import FileConfig, GlobalCompute
 
 __all__ = ["DegiroReader", "FileConfig", "GlobalCompute", "IbkrReader", "IbkrActivity"]
+
+# Public names and the module defining them, imported on first access so `import modelo720` stays cheap
+_LAZY_IMPORTS = {
+    "DegiroReader": "modelo720.degiro",
+    "FileConfig": "modelo720.model",
+    "GlobalCompute": "modelo720.model",
+    "IbkrReader": "modelo720.ibkr",
+    "IbkrActivity": "modelo720.ibkr",
+}
+
+__getattr__ = lazy_getattr(_LAZY_IMPORTS, __name__)
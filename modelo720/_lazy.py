@@ -0,0 +1,31 @@
+"""lazy attributes of the modelo720 packages."""
+
+import sys
+from collections.abc import Callable
+from importlib import import_module
+from typing import Any
+
+
+def lazy_getattr(mapping: dict[str, str], module: str) -> Callable[[str], Any]:
+    """Builds the module `__getattr__` importing public names on first access, so importing a package stays cheap.
+
+    Every imported name is cached in the module, so `__getattr__` is only called once per name:
+
+        __getattr__ = lazy_getattr({"DegiroReader": "modelo720.degiro.reader"}, __name__)
+
+    Args:
+        mapping (dict[str, str]): module defining each public name
+        module (str): name of the module the attributes belong to
+
+    Returns:
+        Callable[[str], Any]: the `__getattr__` of the module.
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name in mapping:
+            value = getattr(import_module(mapping[name]), name)
+            setattr(sys.modules[module], name, value)
+            return value
+        raise AttributeError(f"module {module!r} has no attribute {name!r}")
+
+    return __getattr__
@@ -0,0 +1,226 @@
+"""Content-addressed on-disk cache of parsed broker files.
+
+Entries are Arrow IPC files named after a hash of the source file contents, the reader and its version,
+plus any extra inputs of the parse (year, FX snapshot version, section name...). Previous year exports
+never change, so their parse is served from the cache on every later run.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+
+import polars as pl
+
+CACHE_DIR_ENV_VAR = "MODELO720_CACHE_DIR"
+CACHE_BYPASS_ENV_VAR = "MODELO720_NO_CACHE"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE = 90 * 24 * 3600
+
+
+@lru_cache(maxsize=256)
+def _file_digest(file_path: Path, mtime_ns: int, size: int) -> str:
+    """Hashes the contents of a given version of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(file_path: str | Path) -> str:
+    """Returns the SHA-256 of the contents of a file, hashed once per process while it does not change.
+
+    Args:
+        file_path (Union[str, Path]): file path
+
+    Returns:
+        str: hexadecimal digest
+    """
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    return _file_digest(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+class ParseCache:
+    """On-disk cache of normalized dataframes keyed on the contents of their source file."""
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+        enabled: bool = True,
+    ):
+        """Initializes the cache.
+
+        Args:
+            cache_dir (Union[str, Path]): directory of the cache entries, created on first write
+            max_bytes (int, optional): size above which the least recently used entries are evicted.
+                Defaults to 512 MiB.
+            max_age (float, optional): seconds after which an unused entry is evicted. Defaults to 90 days.
+            enabled (bool, optional): set to False to bypass the cache. Defaults to True.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, file_path: str | Path, reader: str, version: int, **params) -> str:
+        """Builds the key of a parse.
+
+        Args:
+            file_path (Union[str, Path]): source file
+            reader (str): name of the reader
+            version (int): version of the reader, bumped whenever its output changes
+            **params: any other input of the parse (year, FX version, section...)
+
+        Returns:
+            str: cache key
+        """
+        parts = {"file": file_digest(file_path), "reader": reader, "version": version, **params}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.arrow"
+
+    def get(self, key: str) -> pl.DataFrame | None:
+        """Returns a cached dataframe, or None when it is not in the cache.
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            pl.DataFrame | None: cached dataframe
+        """
+        path = self._path(key)
+        try:
+            df = pl.read_ipc(path, memory_map=False)
+        except (OSError, pl.exceptions.PolarsError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return df
+
+    def put(self, key: str, df: pl.DataFrame) -> None:
+        """Stores a dataframe and evicts the entries over the age or size limits.
+
+        Args:
+            key (str): cache key
+            df (pl.DataFrame): dataframe to store
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        df.write_ipc(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def fetch(self, key_args: dict, build: Callable[[], pl.DataFrame]) -> pl.DataFrame:
+        """Returns the cached dataframe of a parse, building and storing it on a miss.
+
+        Args:
+            key_args (dict): keyword arguments of `key`
+            build (Callable[[], pl.DataFrame]): function performing the parse
+
+        Returns:
+            pl.DataFrame: parsed dataframe
+        """
+        if not self.enabled:
+            return build()
+        key = self.key(**key_args)
+        df = self.get(key)
+        if df is None:
+            df = build()
+            self.put(key, df)
+        return df
+
+    def evict(self) -> None:
+        """Removes the entries older than `max_age`, then the least recently used ones above `max_bytes`."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for path in self.cache_dir.glob("*.arrow"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self) -> None:
+        """Removes every entry of the cache."""
+        for path in self.cache_dir.glob("*.arrow"):
+            path.unlink(missing_ok=True)
+
+
+_PARSE_CACHE: ParseCache | None = None
+
+
+def get_parse_cache() -> ParseCache | None:
+    """Returns the process-wide parse cache.
+
+    The cache is enabled by setting the `MODELO720_CACHE_DIR` environment variable (or calling
+    `configure_parse_cache`), and bypassed when `MODELO720_NO_CACHE` is set.
+
+    Returns:
+        ParseCache | None: shared parse cache, or None when no cache directory is configured.
+    """
+    global _PARSE_CACHE
+    if _PARSE_CACHE is None and os.environ.get(CACHE_DIR_ENV_VAR):
+        _PARSE_CACHE = ParseCache(os.environ[CACHE_DIR_ENV_VAR], enabled=not os.environ.get(CACHE_BYPASS_ENV_VAR))
+    return _PARSE_CACHE
+
+
+def configure_parse_cache(
+    cache_dir: str | Path | None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_age: float = DEFAULT_MAX_AGE,
+    enabled: bool = True,
+) -> ParseCache | None:
+    """Replaces the process-wide parse cache.
+
+    Args:
+        cache_dir (Union[str, Path], optional): directory of the cache entries, None to disable the cache
+        max_bytes (int, optional): size limit of the cache. Defaults to 512 MiB.
+        max_age (float, optional): age limit of the entries in seconds. Defaults to 90 days.
+        enabled (bool, optional): set to False to bypass the cache. Defaults to True.
+
+    Returns:
+        ParseCache | None: the new shared parse cache.
+    """
+    global _PARSE_CACHE
+    _PARSE_CACHE = ParseCache(cache_dir, max_bytes, max_age, enabled) if cache_dir is not None else None
+    return _PARSE_CACHE
+
+
+def cached_parse(use_cache: bool, key_args: dict, build: Callable[[], pl.DataFrame]) -> pl.DataFrame:
+    """Serves a parse from the process-wide cache when it is configured and not bypassed.
+
+    Args:
+        use_cache (bool): set to False to bypass the cache for this parse
+        key_args (dict): keyword arguments of `ParseCache.key`
+        build (Callable[[], pl.DataFrame]): function performing the parse
+
+    Returns:
+        pl.DataFrame: parsed dataframe
+    """
+    cache = get_parse_cache() if use_cache else None
+    return cache.fetch(key_args, build) if cache is not None else build()
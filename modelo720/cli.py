@@ -0,0 +1,240 @@
+"""command line interface of modelo720."""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from modelo720.config import setup_logging
+
+# Polars and pydantic are imported by the commands, so `--help` and argument errors return immediately
+if TYPE_CHECKING:
+    from modelo720.model import FileConfig, GlobalInfo
+
+logger = logging.getLogger(__name__)
+
+YEAR_PATTERN = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+
+
+def detect_broker(file_path: str | Path) -> str | None:
+    """Detects the broker of an export from its first bytes.
+
+    Args:
+        file_path (Union[str, Path]): file path of the export
+
+    Returns:
+        str | None: registered broker of a portfolio export, "activity" for an activity statement, or None when
+            the file is not recognized.
+    """
+    from modelo720.registry import detect_reader
+
+    entry = detect_reader(file_path)
+    if entry is None:
+        return None
+    return "activity" if entry.kind == "activity" else entry.name
+
+
+def detect_year(file_path: str | Path) -> int | None:
+    """Detects the year of an export from the last year in its file name, e.g. `Portfolio2024_IBKR.csv`.
+
+    Args:
+        file_path (Union[str, Path]): file path of the export
+
+    Returns:
+        int | None: year of the export, or None when the name holds no year.
+    """
+    years = YEAR_PATTERN.findall(Path(file_path).name)
+    return int(years[-1]) if years else None
+
+
+def discover_configs(directory: str | Path) -> dict[int, list["FileConfig"]]:
+    """Builds the configurations of the broker exports of a directory, grouped by year.
+
+    The broker of every export is detected by the reader registry, and activity statements are attached to the
+    portfolio export of their broker and year; those without one are skipped.
+
+    Args:
+        directory (Union[str, Path]): directory of the broker exports
+
+    Returns:
+        dict[int, list[FileConfig]]: configurations of each year
+    """
+    from modelo720.model import FileConfig
+    from modelo720.registry import classify
+
+    configs: dict[int, list[FileConfig]] = {}
+    activities: list[tuple[int, str, Path]] = []
+    for file_path, entry in classify(directory).items():
+        year = detect_year(file_path)
+        if entry is None or year is None:
+            logger.info(f"Skipped {file_path}: unknown broker or year")
+        elif entry.kind == "activity":
+            activities.append((year, entry.broker, file_path))
+        else:
+            configs.setdefault(year, []).append(FileConfig(file_path, entry.name, True, year))
+
+    for year, broker, activity_file in activities:
+        matched = [config for config in configs.get(year, []) if config.broker == broker]
+        if not matched:
+            logger.info(f"Skipped {activity_file}: no {broker} portfolio export of {year}")
+        for config in matched:
+            config.activity_file = activity_file
+    return configs
+
+
+@contextmanager
+def _stage(timings: dict[str, float], name: str) -> Iterator[None]:
+    """Records the wall time of a stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def _print_timings(timings: dict[str, float]) -> None:
+    """Prints the timing summary of the stages."""
+    width = max(len(name) for name in timings)
+    for name, seconds in timings.items():
+        print(f"  {name:<{width}}  {seconds:8.3f}s")
+    print(f"  {'total':<{width}}  {sum(timings.values()):8.3f}s")
+
+
+def build_directory(
+    directory: str | Path,
+    output_dir: str | Path,
+    year: int | None,
+    info: "GlobalInfo",
+    jobs: int,
+    store: str | Path | None = None,
+) -> dict[str, float]:
+    """Builds the declaration of the exports of a directory.
+
+    The holdings of the previous year are read from the exports of that year, or from the store when the
+    directory has none. The FX rates version is written to `modelo720_<year>.meta.json`, and holdings with an
+    invalid ISIN to `modelo720_<year>_rejects.csv`.
+
+    Args:
+        directory (Union[str, Path]): directory of the broker exports
+        output_dir (Union[str, Path]): directory of the written files
+        year (int, optional): year to declare. Defaults to the last year of the exports.
+        info (GlobalInfo): declarant of the model 720
+        jobs (int): number of files loaded concurrently
+        store (Union[str, Path], optional): SQLite store of the filed declarations, which records the written
+            declaration. Defaults to None.
+
+    Returns:
+        dict[str, float]: wall time of each stage
+
+    Raises:
+        ValueError: If there are no exports for the year.
+    """
+    from modelo720.model import GlobalCompute
+
+    timings: dict[str, float] = {}
+    with _stage(timings, "discover"):
+        configs_by_year = discover_configs(directory)
+    year = year or max(configs_by_year, default=None)
+    if year not in configs_by_year:
+        raise ValueError(f"No broker exports for year {year} in {directory}")
+    if info.year != year:
+        logger.info(f"Declarant year {info.year} differs from the exports year {year}")
+    prev_configs = configs_by_year.get(year - 1)
+
+    with _stage(timings, "load"):
+        compute = GlobalCompute(
+            configs=configs_by_year[year], prev_configs=prev_configs, jobs=jobs, info=info, store=store
+        )
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with _stage(timings, "declaration"):
+        compute.write_financial_record(output_dir / f"modelo720_{year}.720", with_previous=compute.has_previous)
+    if not compute.rejects.is_empty():
+        compute.rejects.write_csv(output_dir / f"modelo720_{year}_rejects.csv")
+    if compute.has_previous:
+        # The difference, proceeds included, is computed with the holdings in the "load" stage
+        compute.data_difference.write_csv(output_dir / f"modelo720_{year}_proceeds.csv")
+    return timings
+
+
+def build(args: argparse.Namespace) -> int:
+    """Runs the `build` command."""
+    from modelo720.model import GlobalInfo, load_manifest, run_batch
+
+    source = Path(args.source)
+    if source.is_file():
+        timings: dict[str, float] = {}
+        with _stage(timings, "manifest"):
+            jobs = load_manifest(source)
+        with _stage(timings, "declarations"):
+            results = run_batch(jobs, workers=args.jobs)
+        for result in results:
+            status = f"{result.records} records" if result.ok else f"FAILED {result.error}"
+            if result.rejects:
+                status += f", {result.rejects} rejected ISINs"
+            print(f"{result.client_id}: {result.output} ({result.seconds:.3f}s, {status})")
+        _print_timings(timings)
+        return 0 if all(result.ok for result in results) else 1
+
+    if not args.declarant:
+        print("modelo720 build: error: directory builds require --declarant", file=sys.stderr)
+        return 2
+    info = GlobalInfo.model_validate_json(Path(args.declarant).read_text())
+    timings = build_directory(source, args.output_dir, args.year, info, args.jobs, args.store)
+    _print_timings(timings)
+    return 0
+
+
+def validate(args: argparse.Namespace) -> int:
+    """Runs the `validate` command."""
+    from modelo720.model import validate_file
+
+    failed = 0
+    for file_path in args.files:
+        start = time.perf_counter()
+        errors = validate_file(file_path, args.tolerance)
+        seconds = time.perf_counter() - start
+        print(f"{file_path}: {len(errors) or 'no'} errors ({seconds:.3f}s)")
+        for record, field, value, error in errors.iter_rows():
+            shown = "" if value is None else f" {value.rstrip()!r}"
+            print(f"  record {record}, {field}:{shown} {error}")
+        failed += not errors.is_empty()
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs the command line interface."""
+    parser = argparse.ArgumentParser(prog="modelo720", description="Build Modelo 720 declarations.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="build the declarations of a directory or manifest")
+    build_parser.add_argument("source", help="directory of broker exports, or JSON manifest of client jobs")
+    build_parser.add_argument("-o", "--output-dir", default=".", help="directory of the written files")
+    build_parser.add_argument("-y", "--year", type=int, help="year to declare (default: last year found)")
+    build_parser.add_argument(
+        "-d", "--declarant", help="JSON file with the declarant information, required for directory builds"
+    )
+    build_parser.add_argument("-j", "--jobs", type=int, default=1, help="files or clients processed concurrently")
+    build_parser.add_argument("-s", "--store", help="SQLite store of the filed declarations, for directory builds")
+    build_parser.set_defaults(func=build)
+
+    validate_parser = subparsers.add_parser("validate", help="check the records of declaration files")
+    validate_parser.add_argument("files", nargs="+", help="declaration files to check")
+    validate_parser.add_argument(
+        "-t", "--tolerance", type=int, help="cents allowed between the header total and the records sum"
+    )
+    validate_parser.set_defaults(func=validate)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
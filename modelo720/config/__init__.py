@@ -1,5 +1,5 @@
 """Config package initialization."""
 
-from .logging import setup_logging
+from .logging import configure_logging, configure_worker_logging, setup_logging, worker_logging
 
-__all__ = ["setup_logging"]
+__all__ = ["configure_logging", "configure_worker_logging", "setup_logging", "worker_logging"]
@@ -1,18 +1,127 @@
-"""Logging configuration for modelo720."""
+"""Logging configuration for modelo720.
 
+Loggers only put records on an in-memory queue; a background `QueueListener` thread formats them and writes
+them to stdout and to the log file, so logging never blocks the loading or rendering loops. Modules log
+through children of the `modelo720` logger, and the entry points (the CLI, `GlobalCompute`, `run_batch`) call
+`setup_logging`, which is idempotent, so importing modelo720 starts no thread. Process pool workers forward
+their records to a listener of the parent process served by `worker_logging`:
+
+    with worker_logging() as records:
+        with ProcessPoolExecutor(initializer=configure_worker_logging, initargs=(records,)) as pool:
+            ...
+
+The log file defaults to `logs/modelo720.log`, under the directory set in `MODELO720_LOG_DIR` when defined.
+"""
+
+import atexit
 import logging
+import multiprocessing
+import os
+import queue
 import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Any
+
+LOG_DIR_ENV_VAR = "MODELO720_LOG_DIR"
+LOGGER_NAME = "modelo720"
+LOG_FILE_NAME = "modelo720.log"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+log_dir = Path(os.environ.get(LOG_DIR_ENV_VAR, "logs"))
+
+_DEFAULT = object()
+
+_lock = threading.RLock()
+_level = logging.INFO
+_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+_loggers: set[str] = set()
+
+
+class _LazyFileHandler(logging.FileHandler):
+    """File handler that creates its directory and file when the first record is written."""
+
+    def __init__(self, filename: str | Path):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+def _output_handlers(log_file: str | Path | None, console: bool) -> list[logging.Handler]:
+    """Builds the handlers writing the records, run by the listener thread."""
+    handlers: list[logging.Handler] = []
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    if log_file is not None:
+        handlers.append(_LazyFileHandler(log_file))
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _stop_listeners() -> None:
+    """Flushes the pending records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+
+
+def _install(handler: QueueHandler) -> None:
+    """Replaces the queue handler of the configured loggers."""
+    global _handler
+    for name in _loggers:
+        logger = logging.getLogger(name)
+        if _handler is not None:
+            logger.removeHandler(_handler)
+        logger.addHandler(handler)
+    _handler = handler
 
-# Create logs directory if it doesn't exist
-log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
 
+def configure_logging(
+    log_file: str | Path | None = _DEFAULT, level: int = logging.INFO, console: bool = True
+) -> QueueHandler:
+    """Replaces the logging destinations of modelo720, flushing the records of the previous ones.
 
-# Configure logging
-def setup_logging(name: str = "modelo720") -> logging.Logger:
+    Args:
+        log_file (Union[str, Path], optional): file the records are appended to, or None to not write a file.
+            Defaults to `modelo720.log` in `log_dir`.
+        level (int, optional): minimum level of the records. Defaults to logging.INFO.
+        console (bool, optional): also writes the records to stdout. Defaults to True.
+
+    Returns:
+        QueueHandler: handler of the loggers, which hands the records over to the listener thread.
+    """
+    global _level, _listener
+    if log_file is _DEFAULT:
+        log_file = log_dir / LOG_FILE_NAME
+    with _lock:
+        _stop_listeners()
+        _level = level
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(records, *_output_handlers(log_file, console), respect_handler_level=True)
+        _listener.start()
+        _install(QueueHandler(records))
+        for name in _loggers:
+            logging.getLogger(name).setLevel(level)
+    return _handler
+
+
+def setup_logging(name: str = LOGGER_NAME) -> logging.Logger:
     """Set up logging configuration.
 
+    The destinations are configured on the first call with the defaults of `configure_logging`; later calls
+    only attach the shared handler to new loggers.
+
     Args:
         name (str): Logger name. Defaults to "modelo720".
 
@@ -20,22 +129,50 @@ def setup_logging(name: str = "modelo720") -> logging.Logger:
         logging.Logger: Configured logger
     """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    with _lock:
+        if _handler is None:
+            configure_logging()
+        if name not in _loggers:
+            _loggers.add(name)
+            logger.setLevel(_level)
+            logger.addHandler(_handler)
+    return logger
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    console_handler.setFormatter(console_formatter)
 
-    # File handler
-    file_handler = logging.FileHandler(log_dir / "modelo720.log")
-    file_handler.setLevel(logging.INFO)
-    file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    file_handler.setFormatter(file_formatter)
+@contextmanager
+def worker_logging() -> Iterator[Any]:
+    """Serves a queue process pool workers put their records on, written by a listener of this process.
 
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    The listener is stopped, after writing the pending records, when the context exits, so the pool must be
+    shut down inside it.
 
-    return logger
+    Yields:
+        multiprocessing.Queue: queue to pass to `configure_worker_logging` in the workers.
+    """
+    with _lock:
+        if _handler is None:
+            configure_logging()
+        records = multiprocessing.get_context("spawn").Queue()
+        listener = QueueListener(records, *_listener.handlers, respect_handler_level=True)
+        listener.start()
+    try:
+        yield records
+    finally:
+        listener.stop()
+        records.close()
+
+
+def configure_worker_logging(records: Any) -> None:
+    """Forwards the records of a process pool worker to the parent process.
+
+    Args:
+        records (multiprocessing.Queue): queue served by `worker_logging` in the parent process
+    """
+    with _lock:
+        _stop_listeners()
+        _loggers.add(LOGGER_NAME)
+        _install(QueueHandler(records))
+        logging.getLogger(LOGGER_NAME).setLevel(_level)
+
+
+atexit.register(_stop_listeners)
@@ -1,5 +1,14 @@
 """degiro __init__ file."""
 
-from modelo720.degiro.reader import DegiroReader
+from typing import TYPE_CHECKING
+
+from modelo720._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from modelo720.degiro.reader import DegiroReader
 
 __all__ = ["DegiroReader"]
+
+_LAZY_IMPORTS = {"DegiroReader": "modelo720.degiro.reader"}
+
+__getattr__ = lazy_getattr(_LAZY_IMPORTS, __name__)
@@ -1,84 +1,91 @@
 """degiro reader for modelo720."""
 
+from functools import cached_property
 from pathlib import Path
+from typing import TypeVar
 
 import polars as pl
 
-from modelo720.utils import try_float
+from modelo720.cache import cached_parse
+from modelo720.instrumentation import span
+from modelo720.utils import parse_number
 
-from .references import COLUMNS_DICT, DESIRED_SCHEMA
+from .references import COLUMNS_DICT, DECIMAL_SEPARATOR, DESIRED_SCHEMA, READER_VERSION, THOUSANDS_SEPARATOR
+
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
 
 
 class DegiroReader:
     """Reads the Degiro portfolio CSV file."""
 
-    def __init__(self, file_path: str | Path):
+    def __init__(self, file_path: str | Path, use_cache: bool = True):
         """Initializes class to read CSV.
 
         Args:
             file_path (Union[str, Path]): file path of the portfolio
+            use_cache (bool, optional): serves `data` from the parse cache when it is configured. Defaults to True.
         """
         self.file_path = Path(file_path)
+        self.use_cache = use_cache
 
-    @property
+    @cached_property
     def data(self):
         """Performs data transformations."""
-        self._data = self.read_dataset()
-        self._data = self._data.rename(COLUMNS_DICT).select(list(COLUMNS_DICT.values()))
-        self._data = self.split_local_value(self._data)
-        self._data = self.convert_num_columns(self._data)
-        self._data = self._data.cast(DESIRED_SCHEMA)
+        key_args = {"file_path": self.file_path, "reader": "degiro", "version": READER_VERSION}
+        with span("degiro.read", file=self.file_path) as read_span:
+            self._data = cached_parse(self.use_cache, key_args, lambda: self.parse(self.read_dataset()))
+            read_span.rows = len(self._data)
         return self._data
 
     def read_dataset(self):
-        """Reads the file."""
-        data = pl.read_csv(self.file_path)
+        """Reads the columns of the file used by the model, as strings."""
+        data = pl.read_csv(self.file_path, columns=list(COLUMNS_DICT), infer_schema=False)
         return data
 
-    @staticmethod
-    def convert_num_columns(df: pl.DataFrame) -> pl.DataFrame:
-        """Convert columns to numeric.
-
-        Args:
-            df (pl.DataFrame): polars dataframe
+    def scan(self) -> pl.LazyFrame:
+        """Builds the lazy counterpart of `data`, so only the columns used downstream are read.
 
         Returns:
-            pl.DataFrame: reformatted dataframe with numeric columns
+            pl.LazyFrame: lazy frame with the `data` schema.
         """
-        for col in df.columns:
-            if df[col].dtype == pl.Float64:
-                continue
-
-            if df[col].dtype == pl.Int64:
-                df = df.with_columns(pl.col(col).cast(pl.Float64).alias(col))
+        return self.parse(pl.scan_csv(self.file_path, infer_schema=False))
 
-            else:
-                try:
-                    sample = df[col].drop_nulls().head(10)
-                    if sample.is_empty():
-                        continue
+    @classmethod
+    def parse(cls, df: FrameT) -> FrameT:
+        """Parses the raw string columns of the portfolio according to `COLUMNS_DICT` and `DESIRED_SCHEMA`.
 
-                    if sample.map_elements(try_float, return_dtype=pl.Float64).sum() > 0:
-                        df = df.with_columns([pl.col(col).str.replace(",", ".").cast(pl.Float64).alias(col)])
-                except Exception:
-                    continue
+        Args:
+            df (pl.DataFrame | pl.LazyFrame): portfolio with the original columns as strings
 
-        return df
+        Returns:
+            pl.DataFrame | pl.LazyFrame: renamed and typed portfolio
+        """
+        df = df.select([pl.col(source).alias(target) for source, target in COLUMNS_DICT.items()])
+        df = cls.split_local_value(df)
+        return df.with_columns(
+            [
+                parse_number(pl.col(col), DECIMAL_SEPARATOR, THOUSANDS_SEPARATOR)
+                if dtype == pl.Float64
+                else pl.col(col).cast(dtype)
+                for col, dtype in DESIRED_SCHEMA.items()
+            ]
+        )
 
     @staticmethod
-    def split_local_value(df: pl.DataFrame, col_name: str = "local_value") -> pl.DataFrame:
+    def split_local_value(df: FrameT, col_name: str = "local_value") -> FrameT:
         """Split local value into currency and value.
 
         Args:
-            df (pl.DataFrame): polars dataframe
+            df (pl.DataFrame | pl.LazyFrame): polars dataframe
             col_name (str, optional): column name. Defaults to "local_value".
 
         Returns:
-            pl.DataFrame: reformatted polars dataframe with split columns
+            pl.DataFrame | pl.LazyFrame: reformatted polars dataframe with split columns
         """
         return df.with_columns(
             pl.col(col_name)
-            .str.extract_groups(r"(\w+)\s+([\d,\.]+)")
+            .str.strip_chars()
+            .str.splitn(" ", 2)
             .struct.rename_fields(["local_curr", "local_value"])
             .alias(col_name),
         ).unnest(col_name)
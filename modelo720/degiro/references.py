@@ -2,6 +2,9 @@
 
 import polars as pl
 
+# Bump whenever the parsed output changes, to invalidate the parse cache entries
+READER_VERSION = 3
+
 COLUMNS_DICT = {
     "Producto": "product",
     "Symbol/ISIN": "isin",
@@ -14,7 +17,11 @@ DESIRED_SCHEMA = {
     "product": pl.Utf8,
     "isin": pl.Utf8,
     "amount": pl.Float64,
+    "price": pl.Float64,
     "local_value": pl.Float64,
     "local_curr": pl.Utf8,
     "eur_value": pl.Float64,
 }
+# Spanish locale of the export: "1.234,56"
+DECIMAL_SEPARATOR = ","
+THOUSANDS_SEPARATOR = "."
@@ -1,5 +1,14 @@
 """ibkr __init__ file."""
 
-from modelo720.ibkr.reader import IbkrActivity, IbkrReader
+from typing import TYPE_CHECKING
+
+from modelo720._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from modelo720.ibkr.reader import IbkrActivity, IbkrReader
 
 __all__ = ["IbkrReader", "IbkrActivity"]
+
+_LAZY_IMPORTS = {"IbkrReader": "modelo720.ibkr.reader", "IbkrActivity": "modelo720.ibkr.reader"}
+
+__getattr__ = lazy_getattr(_LAZY_IMPORTS, __name__)
@@ -1,110 +1,216 @@
 """ibkr reader for modelo720."""
 
-import csv
-from functools import cached_property
+from collections.abc import Iterable
+from functools import cached_property, lru_cache
 from pathlib import Path
 
 import polars as pl
 
-from modelo720.utils import (
-    convert_to_eur_historical,
-    last_trading_day_of_year,
-    try_float,
-)
+from modelo720.cache import cached_parse
+from modelo720.instrumentation import span
+from modelo720.utils import get_fx_engine, last_trading_day_of_year
 
-from .references import COLUMNS_DICT, DESIRED_SCHEMA
+from .references import (
+    ASSET_CATEGORIES,
+    COLUMNS_DICT,
+    DEFAULT_MEMORY_LIMIT,
+    DESIRED_SCHEMA,
+    FUND_TYPES,
+    READER_VERSION,
+)
+from .sections import SectionIndex, index_sections, parse_lines
 
 
 class IbkrReader:
     """Reads the IBKR portfolio CSV file."""
 
-    def __init__(self, file_path: str | Path, year: int):
+    def __init__(self, file_path: str | Path, year: int, use_cache: bool = True):
         """Initializes class to read CSV.
 
         Args:
             file_path (Union[str, Path]): file path of the portfolio
+            use_cache (bool, optional): serves `data` from the parse cache when it is configured. Defaults to True.
         """
         self.file_path = Path(file_path)
         self.year = year
+        self.use_cache = use_cache
 
     @cached_property
     def data(self):
         """Performs data transformations."""
-        self._data = self.read_dataset()
-        self._data = self._data.rename(COLUMNS_DICT).select(list(COLUMNS_DICT.values()))
-        last_trading_day = last_trading_day_of_year(self.year)
-        self._data = self._data.with_columns(
-            pl.struct(["local_value", "local_curr"])
-            .map_elements(
-                lambda x: convert_to_eur_historical(x["local_value"], x["local_curr"], last_trading_day),
-                return_dtype=float,
-            )
-            .alias("eur_value")
-        )
-        self._data = self._data.cast(DESIRED_SCHEMA)
+        key_args = {
+            "file_path": self.file_path,
+            "reader": "ibkr",
+            "version": READER_VERSION,
+            "year": self.year,
+            "fx": get_fx_engine().version,
+        }
+        with span("ibkr.read", file=self.file_path) as read_span:
+            self._data = cached_parse(self.use_cache, key_args, self._parse)
+            read_span.rows = len(self._data)
         return self._data
 
+    def _parse(self) -> pl.DataFrame:
+        """Reads the file, converts the position values to EUR and casts the columns."""
+        df = self.read_dataset()
+        df = df.rename(COLUMNS_DICT).select(list(COLUMNS_DICT.values()))
+        last_trading_day = last_trading_day_of_year(self.year)
+        df = get_fx_engine().to_eur(df, "local_value", "local_curr", pl.lit(last_trading_day), alias="eur_value")
+        return df.cast(DESIRED_SCHEMA)
+
     def read_dataset(self):
         """Reads the file."""
         data = pl.read_csv(self.file_path)
         return data
 
-    @staticmethod
-    def convert_num_columns(df: pl.DataFrame) -> pl.DataFrame:
-        """Convert columns to numeric.
-
-        Args:
-            df (pl.DataFrame): polars dataframe
+    def scan(self) -> pl.LazyFrame:
+        """Builds the lazy counterpart of `data`, so only the columns used downstream are read.
 
         Returns:
-            pl.DataFrame: reformatted dataframe with numeric columns
+            pl.LazyFrame: lazy frame with the `data` schema.
         """
-        for col in df.columns:
-            if df[col].dtype in [pl.Float64, pl.Int64]:
-                continue
-            else:
-                try:
-                    sample = df[col].drop_nulls().head(10)
-                    if sample.is_empty():
-                        continue
-
-                    if sample.map_elements(try_float, return_dtype=pl.Float64).sum() > 0:
-                        df = df.with_columns([pl.col(col).str.replace(",", ".").cast(pl.Float64).alias(col)])
-                except Exception:
-                    continue
+        last_trading_day = last_trading_day_of_year(self.year)
+        return (
+            pl.scan_csv(self.file_path)
+            .select([pl.col(source).alias(target) for source, target in COLUMNS_DICT.items()])
+            .with_columns(
+                get_fx_engine().to_eur_expr("local_value", "local_curr", pl.lit(last_trading_day)).alias("eur_value")
+            )
+            .cast(DESIRED_SCHEMA)
+        )
 
-        return df
+
+class StatementLines(list):
+    """Lines of an activity statement, which keep the file path they were read from."""
+
+    def __init__(self, file_path: str | Path, lines: Iterable[str]):
+        """Initializes the lines.
+
+        Args:
+            file_path (Union[str, Path]): file path of the activity file
+            lines (Iterable[str]): lines of the file
+        """
+        super().__init__(lines)
+        self.file_path = Path(file_path)
 
 
 class IbkrActivity:
     """Reads the IBKR activity CSV file."""
 
-    def __init__(self, file_path: str | Path, year: int):
+    def __init__(
+        self,
+        file_path: str | Path,
+        year: int,
+        streaming: bool = False,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        use_cache: bool = True,
+    ):
         """Initializes class to read CSV.
 
         Args:
             file_path (Union[str, Path]): file path of the activity file
+            streaming (bool, optional): reads each section in chunks so peak memory scales with the largest
+                section instead of the whole statement. Defaults to False.
+            memory_limit (int, optional): maximum number of bytes of raw statement held at once in streaming
+                mode. Defaults to 64 MiB.
+            use_cache (bool, optional): serves the sections from the parse cache when it is configured.
+                Defaults to True.
         """
         self.file_path = Path(file_path)
         self.year = year
+        self.streaming = streaming
+        self.memory_limit = memory_limit
+        self.use_cache = use_cache
+
+    @property
+    def index(self) -> SectionIndex:
+        """Returns the section index of the statement, built once per file."""
+        return index_sections(self.file_path)
+
+    @property
+    def sections(self) -> list[str]:
+        """Returns the names of the sections in the statement."""
+        return self.index.names
+
+    def section(self, name: str) -> pl.DataFrame:
+        """Materializes a section of the statement.
+
+        Args:
+            name (str): section name, e.g. "Trades", "Dividends" or "Open Positions"
+
+        Returns:
+            pl.DataFrame: typed section dataframe
+        """
+        key_args = {"file_path": self.file_path, "reader": "ibkr-activity", "version": READER_VERSION, "section": name}
+        with span("ibkr_activity.section", file=self.file_path, section=name) as section_span:
+            df = cached_parse(
+                self.use_cache,
+                key_args,
+                lambda: self.index.read(name, chunk_size=self.memory_limit if self.streaming else None),
+            )
+            section_span.rows = len(df)
+        return df
+
+    @staticmethod
+    def get_data_with_id(lines: list[str], id: str) -> pl.DataFrame:
+        """Returns a section of the lines of a statement.
+
+        The lines of `raw_lines` are not scanned: the section is read through the section index of their file.
+
+        Args:
+            lines (list[str]): lines of the statement, e.g. `raw_lines`
+            id (str): section name, e.g. "Trades"
+
+        Returns:
+            pl.DataFrame: typed section dataframe
+
+        Raises:
+            ValueError: If the section is not in the statement.
+        """
+        if isinstance(lines, StatementLines):
+            return index_sections(lines.file_path).read(id)
+        return parse_lines(lines, id)
 
     @cached_property
-    def raw_lines(self):
+    def raw_lines(self) -> StatementLines:
+        """Returns the lines of the statement."""
         with open(self.file_path) as f:
-            raw_lines = f.readlines()
-        return raw_lines
+            return StatementLines(self.file_path, f)
 
     @cached_property
     def instruments(self):
         return (
-            self.get_data_with_id(self.raw_lines, "Financial Instrument Information")
+            self.section("Financial Instrument Information")
             .filter(pl.col("Asset Category") == "Stocks")
             .select([pl.col("Security ID").alias("isin"), pl.col("Symbol")])
         )
 
+    @cached_property
+    def asset_classes(self) -> pl.DataFrame:
+        """Classifies the instruments of the statement from their asset category and type.
+
+        Returns:
+            pl.DataFrame: `isin` and `asset_class` of every instrument with an ISIN. Unknown categories are
+                classified as "other".
+        """
+        info = self.section("Financial Instrument Information")
+        if "Security ID" not in info.columns:
+            return pl.DataFrame(schema={"isin": pl.Utf8, "asset_class": pl.Utf8})
+        instrument_type = pl.col("Type") if "Type" in info.columns else pl.lit(None, dtype=pl.Utf8)
+        return (
+            info.filter(pl.col("Security ID").is_not_null())
+            .select(
+                pl.col("Security ID").alias("isin"),
+                instrument_type.replace_strict(FUND_TYPES, default=None)
+                .fill_null(pl.col("Asset Category").replace_strict(ASSET_CATEGORIES, default="other"))
+                .alias("asset_class"),
+            )
+            .unique("isin", keep="last", maintain_order=True)
+        )
+
     @cached_property
     def trades(self):
-        return self.get_data_with_id(self.raw_lines, "Trades").filter(pl.col("Asset Category") == "Stocks")
+        return self.section("Trades").filter(pl.col("Asset Category") == "Stocks")
 
     @cached_property
     def last_sale_data(self):
@@ -112,16 +218,6 @@ class IbkrActivity:
             self.trades
             # Filter out SubTotal rows
             .filter(~pl.col("Header").cast(str).str.contains("SubTotal"))
-            # Replace commas with dots for proper float parsing
-            .with_columns(
-                [
-                    pl.col("Quantity").str.replace(",", "").map_elements(lambda x: x if x else None).cast(pl.Float64),
-                    pl.col("Date/Time")
-                    .str.replace(",", "")
-                    .map_elements(lambda x: x if x else None)
-                    .str.strptime(pl.Datetime, format="%Y-%m-%d %H:%M:%S", strict=False),
-                ]
-            )
             # # Only keep sales (Quantity < 0)
             .filter(pl.col("Quantity") < 0)
             # # For each symbol, get the last sale date
@@ -132,28 +228,49 @@ class IbkrActivity:
 
     @cached_property
     def exit_data(self):
-        df = self.trades.filter(pl.col("Header").cast(str).str.contains("SubTotal")).filter(
-            pl.col("Quantity").cast(pl.Float64) < 0
-        )
+        return self.proceeds()
+
+    def proceeds(self, isins: Iterable[str] | None = None) -> pl.DataFrame:
+        """Computes the EUR proceeds of the stocks sold during the year.
+
+        Args:
+            isins (Iterable[str], optional): restricts the computation to these ISINs, so only their trades
+                are converted to EUR. Defaults to every stock of the statement.
+
+        Returns:
+            pl.DataFrame: sale subtotals with `isin`, `Last_Sale_Date` and `Proceeds_EUR` columns.
+        """
+        instruments = self.instruments
+        trades = self.trades
+        if isins is not None:
+            instruments = instruments.filter(pl.col("isin").is_in(list(isins)))
+            trades = trades.filter(pl.col("Symbol").is_in(instruments["Symbol"]))
+
+        df = trades.filter(pl.col("Header").cast(str).str.contains("SubTotal")).filter(pl.col("Quantity") < 0)
         df = df.join(self.last_sale_data, on="Symbol", how="left")
-        df = df.join(self.instruments, on="Symbol", how="left")
-        df = df.with_columns(
-            [
-                pl.struct(["Proceeds", "Currency", "Last_Sale_Date"])
-                .map_elements(
-                    lambda row: convert_to_eur_historical(row["Proceeds"], row["Currency"], row["Last_Sale_Date"])
-                )
-                .alias("Proceeds_EUR")
-            ]
-        )
+        df = df.join(instruments, on="Symbol", how="left")
+        df = get_fx_engine().to_eur(df, "Proceeds", "Currency", "Last_Sale_Date", alias="Proceeds_EUR")
         return df
 
-    @staticmethod
-    def get_data_with_id(lines: list, id: str):
-        filtered_lines = [line.strip() for line in lines if line.strip().split(",")[0].strip() == id]
 
-        header = next(csv.reader([filtered_lines[0]]))
-        rows = list(csv.reader(filtered_lines[1:]))
+@lru_cache(maxsize=32)
+def _cached_activity(file_path: Path, mtime_ns: int, size: int, year: int) -> IbkrActivity:
+    """Builds the reader of a given version of a statement."""
+    return IbkrActivity(file_path, year)
 
-        df = pl.DataFrame(data=rows, schema=header, orient="row")
-        return df
+
+def get_activity(file_path: str | Path, year: int) -> IbkrActivity:
+    """Returns the reader of an activity statement, shared per file while it does not change.
+
+    The parsed sections are kept by the reader, so a statement is parsed at most once per process.
+
+    Args:
+        file_path (Union[str, Path]): file path of the activity file
+        year (int): year of the statement
+
+    Returns:
+        IbkrActivity: shared reader of the statement
+    """
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    return _cached_activity(file_path, stat.st_mtime_ns, stat.st_size, year)
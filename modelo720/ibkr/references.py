@@ -2,6 +2,9 @@
 
 import polars as pl
 
+# Bump whenever the parsed output changes, to invalidate the parse cache entries
+READER_VERSION = 2
+
 COLUMNS_DICT = {
     "Description": "product",
     "ISIN": "isin",
@@ -17,3 +20,36 @@ DESIRED_SCHEMA = {
     "local_curr": pl.Utf8,
     "eur_value": pl.Float64,
 }
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+ACTIVITY_SCHEMAS = {
+    "Trades": {
+        "Date/Time": pl.Datetime,
+        "Quantity": pl.Float64,
+        "T. Price": pl.Float64,
+        "C. Price": pl.Float64,
+        "Proceeds": pl.Float64,
+        "Comm/Fee": pl.Float64,
+        "Basis": pl.Float64,
+        "Realized P/L": pl.Float64,
+        "MTM P/L": pl.Float64,
+    },
+    "Financial Instrument Information": {
+        "Multiplier": pl.Float64,
+    },
+}
+
+# Asset class of each "Asset Category" of the Financial Instrument Information section
+ASSET_CATEGORIES = {
+    "Stocks": "stock",
+    "Bonds": "bond",
+    "Treasury Bills": "bond",
+    "Mutual Funds": "fund",
+    "Equity and Index Options": "option",
+    "Options On Futures": "option",
+    "Futures": "future",
+    "Warrants": "warrant",
+    "CFDs": "cfd",
+    "Forex": "forex",
+}
+# Instrument types of the "Stocks" category that are collective investment undertakings
+FUND_TYPES = {"ETF": "etf"}
@@ -0,0 +1,218 @@
+"""section index for IBKR Activity statements."""
+
+import io
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from pathlib import Path
+
+import polars as pl
+
+from .references import ACTIVITY_SCHEMAS
+
+ByteRange = tuple[int, int]
+
+
+class SectionBlock:
+    """Byte ranges of one header line and the rows that follow it within a section."""
+
+    def __init__(self, header: ByteRange):
+        """Initializes the block.
+
+        Args:
+            header (ByteRange): (offset, length) of the header line
+        """
+        self.header = header
+        self.rows: list[ByteRange] = []
+
+    def add_row(self, offset: int, length: int) -> None:
+        """Adds a row, merging it with the previous range when both are contiguous."""
+        if self.rows and sum(self.rows[-1]) == offset:
+            last_offset, last_length = self.rows[-1]
+            self.rows[-1] = (last_offset, last_length + length)
+        else:
+            self.rows.append((offset, length))
+
+    @property
+    def size(self) -> int:
+        """Returns the number of bytes of the block."""
+        return self.header[1] + sum(length for _, length in self.rows)
+
+
+class SectionIndex:
+    """Index of the sections of an IBKR Activity statement, built in a single pass over the file.
+
+    Every line of an Activity statement starts with the section name and a discriminator
+    (`Header`, `Data`, `SubTotal`, `Total`...). A section can hold several blocks when IBKR
+    changes its columns (e.g. Stocks and Forex trades), each with its own header line.
+    """
+
+    def __init__(self, file_path: str | Path):
+        """Builds the index.
+
+        Args:
+            file_path (Union[str, Path]): file path of the activity file
+        """
+        self.file_path = Path(file_path)
+        self.blocks: dict[str, list[SectionBlock]] = {}
+        self._build()
+
+    def _build(self) -> None:
+        """Scans the statement once, recording the byte ranges of every section."""
+        offset = 0
+        # Rows of a section come in runs: lines sharing the "<section>,Data," prefix of the previous row
+        # extend the current range without being split
+        run_prefix, run_block, run_start = None, None, 0
+        with open(self.file_path, "rb") as f:
+            for line in f:
+                length = len(line)
+                if run_prefix is not None and line.startswith(run_prefix):
+                    offset += length
+                    continue
+                if run_block is not None:
+                    run_block.add_row(run_start, offset - run_start)
+                    run_prefix, run_block = None, None
+
+                start = 3 if offset == 0 and line.startswith(b"\xef\xbb\xbf") else 0
+                fields = line[start:].split(b",", 2)
+                if len(fields) > 1:
+                    name = fields[0].strip().strip(b'"').decode()
+                    discriminator = fields[1].strip().strip(b'"')
+                    if discriminator == b"Header":
+                        self.blocks.setdefault(name, []).append(SectionBlock((offset + start, length - start)))
+                    elif name in self.blocks:
+                        run_prefix = b",".join(fields[:2]) + b","
+                        run_block, run_start = self.blocks[name][-1], offset
+                offset += length
+        if run_block is not None:
+            run_block.add_row(run_start, offset - run_start)
+
+    @property
+    def names(self) -> list[str]:
+        """Returns the names of the sections in the statement."""
+        return list(self.blocks)
+
+    def read(self, name: str, chunk_size: int | None = None) -> pl.DataFrame:
+        """Materializes a section into a Polars dataframe.
+
+        Args:
+            name (str): section name, e.g. "Trades" or "Financial Instrument Information"
+            chunk_size (int, optional): when given, the rows are read and parsed in chunks of at most this
+                many bytes, so peak memory is bounded by the parsed section instead of its raw text.
+
+        Returns:
+            pl.DataFrame: section rows, with the numeric and date columns of `ACTIVITY_SCHEMAS` parsed.
+
+        Raises:
+            ValueError: If the section is not in the statement.
+        """
+        if name not in self.blocks:
+            raise ValueError(f"Section '{name}' not found in {self.file_path}")
+
+        with open(self.file_path, "rb") as f:
+            frames = []
+            for block in self.blocks[name]:
+                if chunk_size is None:
+                    frames.append(parse_section(self._read_block(f, block), name))
+                else:
+                    chunks = [parse_section(df, name) for df in self._iter_block(f, block, chunk_size)]
+                    frames.append(pl.concat(chunks, rechunk=False))
+        return pl.concat(frames, how="diagonal") if len(frames) > 1 else frames[0]
+
+    @staticmethod
+    def _read_block(f: io.BufferedReader, block: SectionBlock) -> pl.DataFrame:
+        """Reads the byte ranges of a block into a string-typed dataframe."""
+        buffer = bytearray()
+        for offset, length in [block.header, *block.rows]:
+            f.seek(offset)
+            buffer += f.read(length)
+            if not buffer.endswith(b"\n"):
+                buffer += b"\n"
+        return _parse_csv(buffer)
+
+    @staticmethod
+    def _iter_block(f: io.BufferedReader, block: SectionBlock, chunk_size: int) -> Iterator[pl.DataFrame]:
+        """Reads the byte ranges of a block in chunks of whole lines, yielding a string-typed dataframe each."""
+        f.seek(block.header[0])
+        header = f.read(block.header[1]).rstrip(b"\r\n") + b"\n"
+        pending = b""
+        for offset, length in block.rows:
+            f.seek(offset)
+            while length > 0:
+                data = pending + f.read(min(chunk_size, length))
+                length -= len(data) - len(pending)
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    pending = data
+                    continue
+                pending = data[cut:]
+                yield _parse_csv(header + data[:cut])
+        if pending or not block.rows:
+            yield _parse_csv(header + pending + b"\n")
+
+
+def _parse_csv(buffer: bytes | bytearray) -> pl.DataFrame:
+    """Parses the lines of a section block, keeping every column as a string."""
+    return pl.read_csv(io.BytesIO(buffer), infer_schema=False, truncate_ragged_lines=True)
+
+
+def parse_section(df: pl.DataFrame, name: str) -> pl.DataFrame:
+    """Casts the columns of a section according to `ACTIVITY_SCHEMAS`.
+
+    Args:
+        df (pl.DataFrame): string-typed section dataframe
+        name (str): section name
+
+    Returns:
+        pl.DataFrame: typed section dataframe
+    """
+    schema = {col: dtype for col, dtype in ACTIVITY_SCHEMAS.get(name, {}).items() if col in df.columns}
+    return df.with_columns(
+        [
+            pl.col(col).str.replace_all(",", "").str.strptime(dtype, format="%Y-%m-%d %H:%M:%S", strict=False)
+            if dtype == pl.Datetime
+            else pl.col(col).str.replace_all(",", "").cast(dtype, strict=False)
+            for col, dtype in schema.items()
+        ]
+    )
+
+
+def parse_lines(lines: Iterable[str], name: str) -> pl.DataFrame:
+    """Parses a section from the lines of a statement held in memory.
+
+    The first line of the section is its header, and the following lines of the section are its rows.
+
+    Args:
+        lines (Iterable[str]): lines of the statement
+        name (str): section name
+
+    Returns:
+        pl.DataFrame: typed section dataframe
+
+    Raises:
+        ValueError: If the section is not in the lines.
+    """
+    section = [line.strip() for line in lines if line.lstrip("\ufeff").split(",", 1)[0].strip() == name]
+    if not section:
+        raise ValueError(f"Section '{name}' not found in the lines")
+    section[0] = section[0].lstrip("\ufeff")
+    return parse_section(_parse_csv("\n".join([*section, ""]).encode()), name)
+
+
+@lru_cache(maxsize=32)
+def _cached_index(file_path: Path, mtime_ns: int, size: int) -> SectionIndex:
+    """Builds the index of a given version of a file."""
+    return SectionIndex(file_path)
+
+
+def index_sections(file_path: str | Path) -> SectionIndex:
+    """Returns the section index of a statement, cached per file while it does not change.
+
+    Args:
+        file_path (Union[str, Path]): file path of the activity file
+
+    Returns:
+        SectionIndex: section index of the file
+    """
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    return _cached_index(file_path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,247 @@
+"""Per-stage instrumentation of the modelo720 pipeline.
+
+Stages are wrapped in spans that record their wall and CPU time, row count, the peak resident memory of the
+process and the FX rate lookups served from the FX engine caches. CPU time, memory and FX lookups are
+process-wide, so spans running concurrently (e.g. with `GlobalCompute(jobs=...)`) include each other's:
+
+    configure_instrumentation(enabled=True)
+    GlobalCompute(configs).write_financial_record("out.720")
+    get_instrumentation().write_report("metrics.json")
+
+Instrumentation is disabled unless `MODELO720_INSTRUMENT` is set or `configure_instrumentation` enables it.
+When disabled, `span` returns a shared no-op span.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+INSTRUMENT_ENV_VAR = "MODELO720_INSTRUMENT"
+
+SpanCallback = Callable[[dict[str, Any]], None]
+
+
+def _peak_rss() -> int | None:
+    """Returns the peak resident memory of the process in bytes, when the platform reports it."""
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _fx_counters() -> tuple[int, int]:
+    """Returns the lookups of the FX engine served from its rate index or history cache, and the others."""
+    from modelo720.utils import get_fx_engine
+
+    engine = get_fx_engine()
+    return engine.hits + engine.history_hits, engine.misses + engine.history_misses
+
+
+class Span:
+    """Measurements of one run of a stage."""
+
+    def __init__(self, recorder: "Instrumentation", name: str, attrs: dict[str, Any]):
+        """Initializes the span. Measurements start when the span is entered.
+
+        Args:
+            recorder (Instrumentation): recorder collecting the span
+            name (str): name of the stage, e.g. "degiro.read"
+            attrs (dict[str, Any]): attributes of the run, e.g. the file path
+        """
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+        self.rows: int | None = None
+        self.parent: str | None = None
+        self.depth = 0
+
+    def set(self, **attrs: Any) -> None:
+        """Adds attributes to the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        stack = self.recorder._stack()
+        if stack:
+            self.parent, self.depth = stack[-1].name, stack[-1].depth + 1
+        stack.append(self)
+        self._fx = _fx_counters()
+        self._start = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu
+        hits, misses = (now - before for now, before in zip(_fx_counters(), self._fx, strict=True))
+        self.recorder._stack().pop()
+        peak_rss = _peak_rss()
+        self.recorder._record(
+            {
+                "name": self.name,
+                "parent": self.parent,
+                "depth": self.depth,
+                "start": round(self._start - self.recorder.origin, 6),
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "rows": self.rows,
+                "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+                "fx_hits": hits,
+                "fx_misses": misses,
+                "fx_hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+                "error": exc_type.__name__ if exc_type is not None else None,
+                "attrs": {key: str(value) if isinstance(value, Path) else value for key, value in self.attrs.items()},
+            }
+        )
+
+
+class _NullSpan:
+    """Span returned while instrumentation is disabled."""
+
+    rows = None
+
+    def set(self, **attrs: Any) -> None:
+        """Ignores the attributes."""
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Instrumentation:
+    """Recorder of the spans of a process."""
+
+    def __init__(self, enabled: bool = True, callback: SpanCallback | None = None):
+        """Initializes the recorder.
+
+        Args:
+            enabled (bool, optional): records spans. Defaults to True.
+            callback (SpanCallback, optional): called with the metrics of every finished span. Defaults to None.
+        """
+        self.enabled = enabled
+        self.callback = callback
+        self.spans: list[dict[str, Any]] = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list[Span]:
+        """Returns the open spans of the current thread."""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, metrics: dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(metrics)
+        if self.callback is not None:
+            self.callback(metrics)
+
+    def span(self, name: str, **attrs: Any) -> Span | _NullSpan:
+        """Opens a span around a stage.
+
+        Args:
+            name (str): name of the stage
+            **attrs: attributes of the run
+
+        Returns:
+            Span | _NullSpan: context manager measuring the stage; set its `rows` to record the row count.
+        """
+        return Span(self, name, attrs) if self.enabled else _NULL_SPAN
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Aggregates the spans per stage.
+
+        Returns:
+            dict[str, dict[str, Any]]: count, total wall and CPU time and rows of each stage.
+        """
+        totals: dict[str, dict[str, Any]] = {}
+        for metrics in self.spans:
+            total = totals.setdefault(metrics["name"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0})
+            total["count"] += 1
+            total["wall_s"] = round(total["wall_s"] + metrics["wall_s"], 6)
+            total["cpu_s"] = round(total["cpu_s"] + metrics["cpu_s"], 6)
+            total["rows"] += metrics["rows"] or 0
+        return totals
+
+    def report(self) -> dict[str, Any]:
+        """Returns the spans and their per-stage summary.
+
+        Returns:
+            dict[str, Any]: report with `spans` and `summary` keys.
+        """
+        return {"spans": list(self.spans), "summary": self.summary()}
+
+    def write_report(self, file_path: str | Path) -> None:
+        """Writes the report as JSON.
+
+        Args:
+            file_path (Union[str, Path]): file path of the report
+        """
+        Path(file_path).write_text(json.dumps(self.report(), indent=2))
+
+    def clear(self) -> None:
+        """Removes the recorded spans."""
+        with self._lock:
+            self.spans.clear()
+        self.origin = time.perf_counter()
+
+
+_INSTRUMENTATION: Instrumentation | None = None
+
+
+def get_instrumentation() -> Instrumentation:
+    """Returns the process-wide recorder, enabled when `MODELO720_INSTRUMENT` is set.
+
+    Returns:
+        Instrumentation: shared recorder.
+    """
+    global _INSTRUMENTATION
+    if _INSTRUMENTATION is None:
+        _INSTRUMENTATION = Instrumentation(enabled=bool(os.environ.get(INSTRUMENT_ENV_VAR)))
+    return _INSTRUMENTATION
+
+
+def configure_instrumentation(enabled: bool = True, callback: SpanCallback | None = None) -> Instrumentation:
+    """Replaces the process-wide recorder.
+
+    Args:
+        enabled (bool, optional): records spans. Defaults to True.
+        callback (SpanCallback, optional): called with the metrics of every finished span. Defaults to None.
+
+    Returns:
+        Instrumentation: the new shared recorder.
+    """
+    global _INSTRUMENTATION
+    _INSTRUMENTATION = Instrumentation(enabled, callback)
+    return _INSTRUMENTATION
+
+
+def span(name: str, **attrs: Any) -> Span | _NullSpan:
+    """Opens a span of the process-wide recorder.
+
+    Args:
+        name (str): name of the stage
+        **attrs: attributes of the run
+
+    Returns:
+        Span | _NullSpan: context manager measuring the stage.
+    """
+    return get_instrumentation().span(name, **attrs)
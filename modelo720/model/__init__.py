@@ -1,5 +1,52 @@
 """init file."""
 
-from modelo720.model.compute import FileConfig, GlobalCompute
+from typing import TYPE_CHECKING
 
-__all__ = ["FileConfig", "GlobalCompute"]
+from modelo720._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from modelo720.model.batch import ClientJob, ClientResult, load_manifest, run_batch
+    from modelo720.model.compute import FileConfig, GlobalCompute, LoadError
+    from modelo720.model.diff import HoldingsDiff
+    from modelo720.model.instruments import InstrumentIndex, configure_instrument_index, get_instrument_index
+    from modelo720.model.references import GlobalInfo
+    from modelo720.model.store import DeclarationStore
+    from modelo720.model.validator import validate_file, validate_records
+
+__all__ = [
+    "ClientJob",
+    "ClientResult",
+    "DeclarationStore",
+    "FileConfig",
+    "GlobalCompute",
+    "GlobalInfo",
+    "HoldingsDiff",
+    "InstrumentIndex",
+    "LoadError",
+    "configure_instrument_index",
+    "get_instrument_index",
+    "load_manifest",
+    "run_batch",
+    "validate_file",
+    "validate_records",
+]
+
+_LAZY_IMPORTS = {
+    "ClientJob": "modelo720.model.batch",
+    "ClientResult": "modelo720.model.batch",
+    "load_manifest": "modelo720.model.batch",
+    "run_batch": "modelo720.model.batch",
+    "FileConfig": "modelo720.model.compute",
+    "GlobalCompute": "modelo720.model.compute",
+    "LoadError": "modelo720.model.compute",
+    "HoldingsDiff": "modelo720.model.diff",
+    "InstrumentIndex": "modelo720.model.instruments",
+    "configure_instrument_index": "modelo720.model.instruments",
+    "get_instrument_index": "modelo720.model.instruments",
+    "GlobalInfo": "modelo720.model.references",
+    "DeclarationStore": "modelo720.model.store",
+    "validate_file": "modelo720.model.validator",
+    "validate_records": "modelo720.model.validator",
+}
+
+__getattr__ = lazy_getattr(_LAZY_IMPORTS, __name__)
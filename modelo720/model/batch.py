@@ -0,0 +1,138 @@
+"""batch processing of the model 720 of several declarants."""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+from modelo720.cache import configure_parse_cache, get_parse_cache
+from modelo720.config import configure_worker_logging, setup_logging, worker_logging
+from modelo720.utils import configure_fx_engine, get_fx_engine
+
+from .compute import FileConfig, GlobalCompute
+from .references import GlobalInfo
+
+logger = logging.getLogger(__name__)
+
+
+class ClientJob(BaseModel):
+    """Declaration of one client: declarant, broker files, output file and declaration store."""
+
+    client_id: str
+    info: GlobalInfo
+    configs: list[FileConfig]
+    prev_configs: list[FileConfig] | None = None
+    output: Path
+    store: Path | None = None
+
+
+class ClientResult(BaseModel):
+    """Outcome of the declaration of one client."""
+
+    client_id: str
+    output: Path
+    seconds: float
+    records: int = 0
+    # Holdings left out of the declaration for their invalid ISIN
+    rejects: int = 0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Returns whether the declaration was written."""
+        return self.error is None
+
+
+def load_manifest(file_path: str | Path) -> list[ClientJob]:
+    """Reads a JSON manifest holding a list of client jobs.
+
+    Args:
+        file_path (Union[str, Path]): file path of the manifest
+
+    Returns:
+        list[ClientJob]: validated client jobs
+    """
+    return TypeAdapter(list[ClientJob]).validate_json(Path(file_path).read_bytes())
+
+
+def process_client(job: ClientJob) -> ClientResult:
+    """Computes and writes the declaration of one client, recording the failure instead of raising it.
+
+    Args:
+        job (ClientJob): client job
+
+    Returns:
+        ClientResult: outcome of the job
+    """
+    start = time.perf_counter()
+    try:
+        compute = GlobalCompute(configs=job.configs, prev_configs=job.prev_configs, info=job.info, store=job.store)
+        records = compute.write_financial_record(job.output, with_previous=compute.has_previous)
+    except Exception as error:
+        logger.error(f"Failed declaration of client {job.client_id}: {error!r}")
+        return ClientResult(
+            client_id=job.client_id, output=job.output, seconds=time.perf_counter() - start, error=repr(error)
+        )
+    return ClientResult(
+        client_id=job.client_id,
+        output=job.output,
+        seconds=time.perf_counter() - start,
+        records=records,
+        rejects=len(compute.rejects),
+    )
+
+
+def _init_worker(cache_args: tuple | None, snapshot: Path | None, log_queue: Any) -> None:
+    """Configures the parse cache, the FX engine and the logging of a worker like those of the parent process."""
+    configure_worker_logging(log_queue)
+    if cache_args is not None:
+        configure_parse_cache(*cache_args)
+    configure_fx_engine(snapshot)
+
+
+def run_batch(jobs: list[ClientJob], workers: int | None = None) -> list[ClientResult]:
+    """Processes the declarations of several clients over a process pool.
+
+    Workers share the on-disk parse cache and the FX snapshot of the calling process, and each of them keeps
+    its FX engine and parsed activity statements across the clients it processes.
+
+    Args:
+        jobs (list[ClientJob]): client jobs
+        workers (int, optional): number of worker processes, 1 to run in the calling process.
+            Defaults to the number of CPUs.
+
+    Returns:
+        list[ClientResult]: outcome of each job, in the same order as `jobs`.
+    """
+    setup_logging()
+    start = time.perf_counter()
+    if workers == 1:
+        results = [process_client(job) for job in jobs]
+    else:
+        cache = get_parse_cache()
+        cache_args = (cache.cache_dir, cache.max_bytes, cache.max_age, cache.enabled) if cache is not None else None
+        snapshot = get_fx_engine().snapshot
+        # Polars' thread pool does not survive a fork, so worker processes are spawned
+        with (
+            worker_logging() as log_queue,
+            ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(cache_args, snapshot.path if snapshot is not None else None, log_queue),
+            ) as pool,
+        ):
+            results = list(pool.map(process_client, jobs))
+
+    failed = [result.client_id for result in results if not result.ok]
+    logger.info(
+        f"Processed {len(results)} declarations in {time.perf_counter() - start:.2f}s "
+        f"({len(results) - len(failed)} written, {len(failed)} failed)"
+    )
+    if failed:
+        logger.info(f"Failed clients: {failed}")
+    return results
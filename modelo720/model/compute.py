@@ -1,18 +1,47 @@
 """module to build the global model from degiro data."""
 
+import dataclasses
+import json
+import logging
+import multiprocessing
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from datetime import UTC, datetime
+from functools import cached_property
 from pathlib import Path
-from typing import Literal
+from typing import BinaryIO, Literal, TypeVar
 
 import polars as pl
+from pydantic import field_validator
 from pydantic.dataclasses import dataclass
 
-from modelo720.config import setup_logging
+from modelo720.config import configure_worker_logging, setup_logging, worker_logging
 from modelo720.degiro.reader import DegiroReader
 from modelo720.ibkr.reader import IbkrReader
-
-from .references import BROKER_MAP, GLOBAL_INFO
-
-logger = setup_logging()
+from modelo720.instrumentation import span
+from modelo720.registry import AUTO_BROKER, detect_reader, get_reader, readers
+from modelo720.utils import get_fx_engine
+
+from .diff import HoldingsDiff
+from .instruments import KEY_DTYPE, SUBKEY_DTYPE, InstrumentIndex, get_instrument_index
+from .isin import REJECT_REASON, normalize_isin, split_invalid_isins
+from .references import (
+    DECLARATION_KEYS,
+    DEFAULT_ASSET_CLASS,
+    GLOBAL_INFO,
+    METADATA_SUFFIX,
+    RECORD_BATCH_SIZE,
+    RECORD_ENCODING,
+    RECORD_LENGTH,
+    GlobalInfo,
+)
+from .store import DeclarationStore
+from .validator import validate_records
+
+logger = logging.getLogger(__name__)
+
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
 
 
 @dataclass
@@ -20,53 +49,322 @@ class FileConfig:
     """Configuration dataclass for broker information."""
 
     file_path: str | Path
-    broker: Literal["ibkr", "degiro"]
+    # Name of a registered portfolio reader, or "auto" to detect it from the file
+    broker: str
     presented: bool
     year: int
+    activity_file: str | Path | None = None
+
+    @field_validator("broker")
+    @classmethod
+    def _check_broker(cls, broker: str) -> str:
+        if broker != AUTO_BROKER and get_reader(broker).kind != "portfolio":
+            raise ValueError(f"'{broker}' is not a portfolio reader")
+        return broker
+
+    def resolve(self) -> "FileConfig":
+        """Returns the configuration with its broker detected from the file when it is "auto".
+
+        Returns:
+            FileConfig: configuration with a registered broker.
+
+        Raises:
+            ValueError: If the broker of the file is not recognized.
+        """
+        if self.broker != AUTO_BROKER:
+            return self
+        entry = detect_reader(self.file_path)
+        if entry is None or entry.kind != "portfolio":
+            raise ValueError(f"Could not detect the broker of {self.file_path}")
+        return dataclasses.replace(self, broker=entry.name)
+
+
+class LoadError(Exception):
+    """Raised when one or more broker files fail to load concurrently."""
+
+    def __init__(self, errors: dict[str, BaseException]):
+        """Initializes the error.
+
+        Args:
+            errors (dict[str, BaseException]): exception raised by each failing file, keyed on its path.
+        """
+        self.errors = errors
+        details = "; ".join(f"{file_path}: {error!r}" for file_path, error in errors.items())
+        super().__init__(f"Failed to load {len(errors)} file(s): {details}")
 
 
 class GlobalCompute:
     """Main class to transform data into global model."""
 
-    def __init__(self, configs: list[FileConfig], prev_configs: list[FileConfig] | None = None):
+    def __init__(
+        self,
+        configs: list[FileConfig],
+        prev_configs: list[FileConfig] | None = None,
+        lazy: bool = False,
+        streaming: bool = False,
+        jobs: int = 1,
+        executor: Literal["thread", "process"] = "thread",
+        info: GlobalInfo = GLOBAL_INFO,
+        store: DeclarationStore | str | Path | None = None,
+    ):
         """Initializes the class with the configuration.
 
         Args:
             config (list[FileConfig]): List of configuration objects containing broker details.
+            prev_configs (list[FileConfig], optional): configurations of the previous year.
+            lazy (bool, optional): builds a single lazy pipeline over all the files, which is collected the first
+                time `data`, `old_data` or `data_difference` is requested. Defaults to False.
+            streaming (bool, optional): collects the lazy pipeline with the streaming engine. Defaults to False.
+            jobs (int, optional): number of files of the current and previous year loaded concurrently.
+                Defaults to 1.
+            executor (Literal["thread", "process"], optional): pool used when `jobs` > 1. Defaults to "thread".
+            info (GlobalInfo, optional): declarant of the model 720. Defaults to `GLOBAL_INFO`.
+            store (Union[DeclarationStore, str, Path], optional): store of the filed declarations. Without
+                `prev_configs`, the holdings of the previous year are read from it, and every written declaration
+                is recorded in it. Defaults to None.
+        """
+        setup_logging()
+        self.config = [config.resolve() for config in configs]
+        self.prev_config = [config.resolve() for config in prev_configs] if prev_configs is not None else None
+        self.lazy = lazy
+        self.streaming = streaming
+        self.jobs = jobs
+        self.executor = executor
+        self.info = info
+        self.store = DeclarationStore(store) if isinstance(store, str | Path) else store
+        if not lazy:
+            loaded = self._load_all([*self.config, *(self.prev_config or [])])
+            dataframes = [df for df, _ in loaded]
+            self.rejects = pl.concat([rejected for _, rejected in loaded], how="vertical_relaxed")
+            with span("compute.classify", instruments=len(self.instruments)) as classify_span:
+                dataframes = [self.instruments.classify(df) for df in dataframes]
+                classify_span.rows = sum(len(df) for df in dataframes)
+            self.dataframes = dataframes[: len(configs)]
+            self.old_dataframes = dataframes[len(configs) :] if prev_configs is not None else self._stored_dataframes()
+            if self.has_previous:
+                self.data_difference = self.compute_difference()
+
+    @cached_property
+    def has_previous(self) -> bool:
+        """Returns whether the holdings of the previous year are known, from `prev_configs` or the store.
+
+        Returns:
+            bool: True when there is previous data to compare with.
+        """
+        if self.prev_config is not None:
+            return True
+        return self.store is not None and self.store.has(self.info.dni_number, self.info.year - 1)
+
+    @cached_property
+    def instruments(self) -> InstrumentIndex:
+        """Returns the instrument index of the holdings, the shared one.
+
+        Returns:
+            InstrumentIndex: index used to filter the holdings and assign their model 720 key.
+        """
+        return get_instrument_index()
+
+    @cached_property
+    def activity_instruments(self) -> InstrumentIndex:
+        """Returns the shared instrument index extended with the instruments of the activity files.
+
+        The activity files are parsed on first access, which only happens when there are closed holdings.
+
+        Returns:
+            InstrumentIndex: index used to filter the closed holdings and assign their model 720 key.
+        """
+        index = self.instruments
+        for config in [*self.config, *(self.prev_config or [])]:
+            if config.activity_file is not None:
+                activity = InstrumentIndex.from_activity(config.activity_file, config.year, config.broker)
+                index = index.merge(activity)
+        return index
+
+    def _stored_dataframes(self) -> list[pl.DataFrame]:
+        """Reads the holdings of the previous year declaration from the store, when recorded.
+
+        Returns:
+            list[pl.DataFrame]: the previous holdings, or no dataframe when the store has none.
+        """
+        if not self.has_previous:
+            return []
+        with span("compute.store_read", year=self.info.year - 1) as read_span:
+            df = self.store.holdings(self.info.dni_number, self.info.year - 1).drop("order_type")
+            if df["key"].null_count():
+                # Declarations recorded before their holdings were keyed
+                df = self.instruments.classify(df.drop(["key", "subkey"]))
+            read_span.rows = len(df)
+        logger.info(f"Loaded {len(df)} holdings of {self.info.year - 1} from {self.store.path}")
+        return [df]
+
+    @staticmethod
+    def _get_reader(config: FileConfig) -> DegiroReader | IbkrReader:
+        """Builds the registered reader of the broker specified in the configuration.
+
+        Args:
+            config (FileConfig): Configuration object containing broker details.
+
+        Returns:
+            DegiroReader | IbkrReader: broker reader, or the reader of a broker plugin.
+
+        Raises:
+            ValueError: If the broker type is invalid.
         """
-        self.config = configs
-        self.dataframes = [self._load_data(config) for config in configs]
-        self.old_dataframes = [self._load_data(config) for config in prev_configs] if prev_configs else []
-        if prev_configs is not None:
-            self.data_difference = self.compute_difference()
+        return get_reader(config.broker).factory(Path(config.file_path), config.year)
 
-    def _load_data(self, config: FileConfig) -> pl.DataFrame:
+    def _load_all(self, configs: list[FileConfig]) -> list[tuple[pl.DataFrame, pl.DataFrame]]:
+        """Loads the data of several configurations, concurrently when `jobs` > 1.
+
+        Args:
+            configs (list[FileConfig]): Configuration objects containing broker details.
+
+        Returns:
+            list[tuple[pl.DataFrame, pl.DataFrame]]: Loaded data and rejected holdings, in the same order as
+                `configs`.
+
+        Raises:
+            LoadError: If any file fails to load when loading concurrently.
+        """
+        if self.jobs <= 1 or len(configs) <= 1:
+            return [self._load_data(config) for config in configs]
+
+        with ExitStack() as stack:
+            if self.executor == "process":
+                # Polars' thread pool does not survive a fork, so worker processes are spawned
+                pool = ProcessPoolExecutor(
+                    max_workers=self.jobs,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=configure_worker_logging,
+                    initargs=(stack.enter_context(worker_logging()),),
+                )
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.jobs)
+            with pool:
+                futures = [pool.submit(self._load_data, config) for config in configs]
+                wait(futures)
+
+        errors = {}
+        for config, future in zip(configs, futures, strict=True):
+            if future.exception() is not None:
+                logger.error(f"Failed to load {config.file_path} ({config.broker}): {future.exception()!r}")
+                errors[str(config.file_path)] = future.exception()
+        if errors:
+            raise LoadError(errors)
+        return [future.result() for future in futures]
+
+    @classmethod
+    def _load_data(cls, config: FileConfig) -> tuple[pl.DataFrame, pl.DataFrame]:
         """Loads data based on the broker type specified in the configuration.
 
+        ISINs are normalized, and the holdings with an invalid ISIN are set aside instead of being loaded.
+
         Args:
             config (FileConfig): Configuration object containing broker details.
 
         Returns:
-            pl.DataFrame: Loaded data as a Polars DataFrame.
+            tuple[pl.DataFrame, pl.DataFrame]: Loaded data as a Polars DataFrame, and the rejected holdings with
+                their `reason` and `file`.
 
         Raises:
             ValueError: If the broker type is invalid.
         """
         broker = config.broker
+        with span("compute.load", broker=broker, file=config.file_path) as load_span:
+            reader = cls._get_reader(config)
+
+            logger.info(f"Loaded data for broker: {broker} | Presented: {config.presented}")
+            df = reader.data.select(get_reader(broker).info.columns)
+            df = cls.add_broker_code(df, broker).with_columns(normalize_isin())
+            df = cls.remove_null_values(df, "isin", broker)
+            with span("compute.validate_isins", broker=broker) as validate_span:
+                df, rejected = split_invalid_isins(df)
+                validate_span.rows = len(rejected)
+            cls._log_rejected(rejected, broker)
+            load_span.rows = len(df)
+        return df, rejected.with_columns(pl.lit(str(config.file_path)).alias("file"))
+
+    def _scan_data(self, config: FileConfig) -> pl.LazyFrame:
+        """Lazy counterpart of `_load_data`, without the null filter and the ISIN validation.
+
+        Args:
+            config (FileConfig): Configuration object containing broker details.
 
-        if broker == "degiro":
-            reader = DegiroReader(config.file_path)
-        elif broker == "ibkr":
-            reader = IbkrReader(config.file_path, config.year)
+        Returns:
+            pl.LazyFrame: lazy frame reading only the columns of the model.
+        """
+        broker = config.broker
+        reader = self._get_reader(config)
+
+        logger.info(f"Scanning data for broker: {broker} | Presented: {config.presented}")
+        lf = reader.scan().select(get_reader(broker).info.columns)
+        lf = self.add_broker_code(lf, broker).with_columns(normalize_isin())
+        return lf
+
+    def _collect(self) -> None:
+        """Collects the lazy pipeline of the current and previous year files in a single pass."""
+        configs = [*self.config, *(self.prev_config or [])]
+        frames = [self._scan_data(config) for config in configs]
+        validated = [split_invalid_isins(lf.filter(pl.col("isin").is_not_null())) for lf in frames]
+        kept = [self.instruments.classify(valid) for valid, _ in validated]
+        deleted = [lf.filter(pl.col("isin").is_null()).select("product") for lf in frames]
+        rejected = [
+            invalid.with_columns(pl.lit(str(config.file_path)).alias("file"))
+            for config, (_, invalid) in zip(configs, validated, strict=True)
+        ]
+        results = pl.collect_all([*kept, *deleted, *rejected], streaming=self.streaming)
+
+        for config, deleted_df in zip(configs, results[len(frames) : 2 * len(frames)], strict=True):
+            self._log_deleted(deleted_df, config.broker)
+        for config, rejected_df in zip(configs, results[2 * len(frames) :], strict=True):
+            self._log_rejected(rejected_df, config.broker)
+        self.__dict__["rejects"] = pl.concat(results[2 * len(frames) :], how="vertical_relaxed")
+        self.__dict__["dataframes"] = results[: len(self.config)]
+        if self.prev_config is not None:
+            self.__dict__["old_dataframes"] = results[len(self.config) : len(frames)]
         else:
-            raise ValueError(f"Unsupported broker type: {broker}")
+            self.__dict__["old_dataframes"] = self._stored_dataframes()
 
-        logger.info(f"Loaded data for broker: {broker} | Presented: {config.presented}")
-        df = reader.data.select(BROKER_MAP[broker].columns)
-        df = self.add_broker_code(df, broker)
-        df = self.remove_options(df)
-        df = self.remove_null_values(df, "isin", broker)
-        return df
+    @cached_property
+    def dataframes(self) -> list[pl.DataFrame]:
+        """Returns the loaded dataframes of the current year, collecting the lazy pipeline on first access.
+
+        Returns:
+            list[pl.DataFrame]: one dataframe per configuration.
+        """
+        self._collect()
+        return self.__dict__["dataframes"]
+
+    @cached_property
+    def rejects(self) -> pl.DataFrame:
+        """Returns the holdings rejected for their invalid ISIN, collecting the lazy pipeline on first access.
+
+        Returns:
+            pl.DataFrame: rejected holdings of the current and previous year files, with the `reason` their ISIN
+                is invalid and the `file` they come from.
+        """
+        self._collect()
+        return self.__dict__["rejects"]
+
+    @cached_property
+    def old_dataframes(self) -> list[pl.DataFrame]:
+        """Returns the loaded dataframes of the previous year, collecting the lazy pipeline on first access.
+
+        Returns:
+            list[pl.DataFrame]: one dataframe per previous year configuration.
+        """
+        self._collect()
+        return self.__dict__["old_dataframes"]
+
+    @cached_property
+    def data_difference(self) -> pl.DataFrame:
+        """Returns the difference between current and previous data, computed on first access in lazy mode.
+
+        Returns:
+            pl.DataFrame: output of `compute_difference`.
+        """
+        if not self.has_previous:
+            raise AttributeError("data_difference requires prev_configs or a previous declaration in the store")
+        return self.compute_difference()
 
     @staticmethod
     def _concat_data(dataframes_list=list[pl.DataFrame]) -> pl.DataFrame:
@@ -99,12 +397,21 @@ class GlobalCompute:
         """
         return self._concat_data(self.old_dataframes)
 
+    @property
+    def fx_version(self) -> str:
+        """Returns the version of the FX rates used to value the holdings.
+
+        Returns:
+            str: FX snapshot version.
+        """
+        return get_fx_engine().version
+
     @property
     def financial_record(self) -> str:
         return "\n".join(self.generate_financial_record())
 
     @staticmethod
-    def remove_null_values(df: pl.DataFrame, col_filter: str, broker: Literal["ibkr", "degiro"]) -> pl.DataFrame:
+    def remove_null_values(df: pl.DataFrame, col_filter: str, broker: str) -> pl.DataFrame:
         """Removes null values from the dataframe.
 
         Args:
@@ -114,64 +421,111 @@ class GlobalCompute:
         Returns:
             pl.DataFrame: dataframe without null values
         """
-        deleted_df = df.filter(pl.col(col_filter).is_null())
+        GlobalCompute._log_deleted(df.filter(pl.col(col_filter).is_null()), broker)
+        return df.filter(pl.col(col_filter).is_not_null())
+
+    @staticmethod
+    def _log_rejected(rejected_df: pl.DataFrame, broker: str) -> None:
+        """Logs the number of holdings of a broker rejected for each reason.
+
+        Args:
+            rejected_df (pl.DataFrame): rejected rows, with a `reason` column.
+            broker (str): The broker reference.
+        """
+        if not rejected_df.is_empty():
+            reasons = dict(rejected_df[REJECT_REASON].value_counts(sort=True).iter_rows())
+            logger.warning(f"Rejected {len(rejected_df)} holdings from {broker} with an invalid ISIN: {reasons}")
+
+    @staticmethod
+    def _log_deleted(deleted_df: pl.DataFrame, broker: str) -> None:
+        """Logs the products removed from a broker dataframe.
+
+        Args:
+            deleted_df (pl.DataFrame): removed rows, with a `product` column.
+            broker (str): The broker reference.
+        """
         if not deleted_df.is_empty():
             deleted_broker_product = deleted_df.select(["product"]).to_series().to_list()
             logger.info(f"Deleted products from {broker}: {deleted_broker_product} ")
-        return df.filter(pl.col(col_filter).is_not_null())
 
     @staticmethod
-    def add_broker_code(df: pl.DataFrame, broker: Literal["ibkr", "degiro"]) -> pl.DataFrame:
+    def add_broker_code(df: FrameT, broker: str) -> FrameT:
         """Add to a dataframe an identification of country for the broker.
 
         Args:
-            df (pl.DataFrame): Original dataframe.
-            broker (Literal['ibkr', 'degiro']): The broker reference, either 'degiro' or 'ibkr'.
+            df (pl.DataFrame | pl.LazyFrame): Original dataframe.
+            broker (str): The broker reference, e.g. 'degiro' or 'ibkr'.
 
         Returns:
             pl.DataFrame: Modified dataframe with broker_country_id column.
-        """
-        broker_map = {broker: info.country for broker, info in BROKER_MAP.items()}
 
-        if broker not in broker_map:
-            raise ValueError(f"Invalid broker reference '{broker}'. Must be 'degiro' or 'ibkr'.")
+        Raises:
+            ValueError: If the broker has no registered portfolio reader.
+        """
+        info = get_reader(broker).info
+        if info is None:
+            raise ValueError(f"Invalid broker reference '{broker}'. Must be a portfolio reader.")
 
-        return df.with_columns(pl.lit(broker_map[broker]).alias("broker_country_id"))
+        return df.with_columns(pl.lit(info.country).alias("broker_country_id"))
 
-    # TODO: Remove options
     @staticmethod
-    def remove_options(df: pl.DataFrame) -> pl.DataFrame:
-        """Removes the rows which correspond to options contracts
+    def with_default_keys(df: pl.DataFrame) -> pl.DataFrame:
+        """Adds the model 720 key and subkey of `DEFAULT_ASSET_CLASS` to holdings that were not classified.
 
         Args:
-            df (pl.DataFrame): original dataframe
+            df (pl.DataFrame): holdings, with or without `key` and `subkey` columns
 
         Returns:
-            pl.DataFrame: filtered dataframe
+            pl.DataFrame: holdings with `key` and `subkey` columns.
         """
-        option_pattern = r"\b[A-Z]{1,6} \d{2}[A-Z]{3}\d{2} \d+(\.\d+)? [CP]\b"
-        return df.filter(~pl.col("product").str.contains(option_pattern))
+        if "key" in df.columns and "subkey" in df.columns:
+            return df
+        key, subkey = DECLARATION_KEYS[DEFAULT_ASSET_CLASS]
+        return df.with_columns(
+            pl.lit(key, dtype=KEY_DTYPE).alias("key"), pl.lit(subkey, dtype=SUBKEY_DTYPE).alias("subkey")
+        )
 
-    def generate_financial_record(self) -> str:
-        """Generates the financial record for the model 720.
+    def _declaration(self, with_previous: bool = False) -> tuple[str, list[tuple[pl.DataFrame, str]]]:
+        """Plans the records of the declaration.
+
+        Args:
+            with_previous (bool, optional): also declares again the old holdings still held. Defaults to False.
 
         Returns:
-            str: model 720 financial record
+            tuple[str, list[tuple[pl.DataFrame, str]]]: header record, and the holdings to render as
+                transaction records with their option, in declaration order.
         """
-        output = []
-
+        logger.info(f"Generating financial record with FX rates: {self.fx_version}")
         data = self.data
         declared_values = self.get_count(data)
         total_amount = data["eur_value"].sum()
+        transactions = []
+
+        if with_previous:
+            # Old holdings still held are declared again with the values of their first old row
+            kept_old_data = HoldingsDiff(data, self.old_data).kept
+            declared_values += self.get_count(kept_old_data)
+            total_amount += kept_old_data["eur_value"].sum()
+            transactions.append((kept_old_data, "C"))
+        transactions.append((data, "A"))
 
-        # Generate header record (17 record)
-        output.append(self.get_header(declared_values, total_amount))
+        return self.get_header(declared_values, total_amount, self.info), transactions
+
+    def generate_financial_record(self) -> str:
+        """Generates the financial record for the model 720.
+
+        Returns:
+            str: model 720 financial record
+        """
+        with span("compute.render", with_previous=False) as render_span:
+            # Generate header record (17 record)
+            header, transactions = self._declaration()
+            output = [header]
 
-        # Generate transaction records (27 record)
-        for row in data.to_dicts():
-            transaction_sub1, transaction_sub2 = self.get_transaction_record(row, "A")
-            output.append(transaction_sub1)
-            output.append(transaction_sub2)
+            # Generate transaction records (27 record)
+            for df, option in transactions:
+                output.extend(self.render_transaction_records(df, option, self.info))
+            render_span.rows = len(output)
 
         return output
 
@@ -188,51 +542,295 @@ class GlobalCompute:
         return len(df)
 
     def generate_financial_record_with_previous(self) -> str:
-        output = []
+        with span("compute.render", with_previous=True) as render_span:
+            # Generate header record (17 record)
+            header, transactions = self._declaration(with_previous=True)
+            output = [header]
 
-        # Gets old data and new data
-        old_data = self.old_data
-        old_data_products = old_data["product"].to_list()
-        data = self.data
-        data_products = data["product"].to_list()
+            # Appends old transaction records, then the current ones (27 record)
+            for df, option in transactions:
+                output.extend(self.render_transaction_records(df, option, self.info))
+            render_span.rows = len(output)
 
-        # Get the count of the data and the total sum
-        total_amount = data["eur_value"].sum()
-        declared_values = self.get_count(data)
+        return output
+
+    def write_financial_record(
+        self,
+        dest: str | Path | BinaryIO,
+        with_previous: bool = False,
+        batch_size: int = RECORD_BATCH_SIZE,
+    ) -> int:
+        """Writes the declaration file to submit to the AEAT.
 
-        # Generates the modified output records and modifies the declared values accordingly
-        old_data_output = []
-        for product in old_data_products:
-            if product in data_products:
-                row = old_data.filter(pl.col("product") == product).to_dicts()[0]
-                transaction_sub1, transaction_sub2 = self.get_transaction_record(row, "C")
-                old_data_output.append(transaction_sub1)
-                old_data_output.append(transaction_sub2)
-                declared_values += 1
+        Every record is padded with blanks to `RECORD_LENGTH` characters, encoded in `RECORD_ENCODING` and
+        terminated by CRLF. Transaction records are rendered and written `batch_size` holdings at a time. When
+        `dest` is a file path, the FX rates version is written next to it, see `write_metadata`. With a store, the
+        declared holdings are then recorded in it.
+
+        Args:
+            dest (Union[str, Path, BinaryIO]): file path, or binary stream to write to.
+            with_previous (bool, optional): also declares again the old holdings still held. Defaults to False.
+            batch_size (int, optional): number of holdings rendered per write. Defaults to 10000.
+
+        Returns:
+            int: number of records written.
+
+        Raises:
+            ValueError: If a record is longer than `RECORD_LENGTH` or not representable in `RECORD_ENCODING`.
+        """
+        with span("compute.write", with_previous=with_previous) as write_span:
+            header, transactions = self._declaration(with_previous)
+            if isinstance(dest, str | Path):
+                with open(dest, "wb") as f:
+                    written = self._write_records(f, header, transactions, batch_size, self.info)
+                self.write_metadata(Path(dest).with_suffix(METADATA_SUFFIX), written, with_previous)
             else:
-                pass
+                written = self._write_records(dest, header, transactions, batch_size, self.info)
+            write_span.rows = written
+        if self.store is not None:
+            self.record_declaration()
+        return written
 
-        # Generate header record (17 record)
-        output.append(self.get_header(declared_values, total_amount))
+    def write_metadata(self, file_path: str | Path, records: int, with_previous: bool = False) -> None:
+        """Writes the metadata of a declaration file as JSON, so the FX rates used to value it are known.
 
-        # Appends old transaction records (27 record)
-        output.extend(old_data_output)
+        Args:
+            file_path (Union[str, Path]): file path of the metadata, `METADATA_SUFFIX` next to the declaration
+            records (int): number of records of the declaration
+            with_previous (bool, optional): whether the old holdings still held were declared again.
+                Defaults to False.
+        """
+        metadata = {
+            "declarant": self.info.dni_number,
+            "year": self.info.year,
+            "fx_version": self.fx_version,
+            "records": records,
+            "with_previous": with_previous,
+            "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        }
+        Path(file_path).write_text(json.dumps(metadata, indent=2) + "\n")
+
+    def records(self, with_previous: bool = False) -> pl.Series:
+        """Renders the records of the declaration file in memory, padded to `RECORD_LENGTH` characters.
 
-        # Generate transaction records (27 record)
-        for row in data.to_dicts():
-            transaction_sub1, transaction_sub2 = self.get_transaction_record(row, "A")
-            output.append(transaction_sub1)
-            output.append(transaction_sub2)
+        Args:
+            with_previous (bool, optional): also declares again the old holdings still held. Defaults to False.
 
-        return output
+        Returns:
+            pl.Series: header record followed by the transaction records, without line terminators.
+        """
+        header, transactions = self._declaration(with_previous)
+        batches = self._render_batches(header, transactions, RECORD_BATCH_SIZE, self.info)
+        return pl.concat([records for _, records in batches]).str.pad_end(RECORD_LENGTH)
+
+    def validate(self, with_previous: bool = False, tolerance_cents: int | None = None) -> pl.DataFrame:
+        """Validates the declaration file before it is written, see `validator.validate_records`.
+
+        Args:
+            with_previous (bool, optional): also declares again the old holdings still held. Defaults to False.
+            tolerance_cents (int, optional): difference allowed between the total valuation of the header and the
+                sum of the valuations of the transaction records. Defaults to one cent per transaction record.
+
+        Returns:
+            pl.DataFrame: `record`, `field`, `value` and `error` of every error found; empty when valid.
+        """
+        with span("compute.validate", with_previous=with_previous) as validate_span:
+            records = self.records(with_previous)
+            errors = validate_records(records, tolerance_cents)
+            validate_span.rows = len(records)
+        if not errors.is_empty():
+            logger.warning(f"Declaration of {self.info.year} has {len(errors)} errors")
+        return errors
+
+    def record_declaration(self) -> int:
+        """Records the holdings of the declaration of the current year in the store.
+
+        Returns:
+            int: number of holdings recorded.
+
+        Raises:
+            ValueError: If the class has no store.
+        """
+        if self.store is None:
+            raise ValueError("record_declaration requires a store")
+        holdings = (
+            self.data_difference.filter(pl.col("order_type") != "C")
+            if self.has_previous
+            else self.data.with_columns(pl.lit("A").alias("order_type"))
+        )
+        with span("compute.store_write", year=self.info.year) as write_span:
+            recorded = self.store.save(self.info.dni_number, self.info.year, holdings, self.fx_version)
+            write_span.rows = recorded
+        logger.info(f"Recorded {recorded} holdings of {self.info.year} in {self.store.path}")
+        return recorded
+
+    @classmethod
+    def _write_records(
+        cls,
+        f: BinaryIO,
+        header: str,
+        transactions: list[tuple[pl.DataFrame, str]],
+        batch_size: int,
+        info: GlobalInfo,
+    ) -> int:
+        """Writes the header and the transaction records of a declaration to a binary stream."""
+        written = 0
+        for holdings, records in cls._render_batches(header, transactions, batch_size, info):
+            f.write(cls._encode_records(records, holdings))
+            written += len(records)
+        return written
+
+    @classmethod
+    def _render_batches(
+        cls,
+        header: str,
+        transactions: list[tuple[pl.DataFrame, str]],
+        batch_size: int,
+        info: GlobalInfo,
+    ) -> Iterator[tuple[pl.DataFrame | None, pl.Series]]:
+        """Renders the unpadded records of a declaration, the header first, `batch_size` holdings at a time.
+
+        Yields each batch of holdings with its records, the header having no holdings.
+        """
+        yield None, pl.Series([header])
+        for df, option in transactions:
+            if df.is_empty():
+                continue
+            transaction_sub1, transaction_sub2 = cls._transaction_exprs(option, info)
+            df = cls.with_default_keys(df)
+            for batch in df.iter_slices(batch_size):
+                yield batch, batch.select(pl.concat_str([transaction_sub1, transaction_sub2])).to_series()
+
+    @staticmethod
+    def _encode_records(records: pl.Series, holdings: pl.DataFrame | None = None) -> bytes:
+        """Pads records to `RECORD_LENGTH` and encodes them with their line terminators.
+
+        Args:
+            records (pl.Series): unpadded records.
+            holdings (pl.DataFrame, optional): holdings rendered as the records, to name them in errors.
+                Defaults to None.
+
+        Returns:
+            bytes: encoded records.
+
+        Raises:
+            ValueError: If a record is null, as when a value of its holding is missing, longer than
+                `RECORD_LENGTH` or not representable in `RECORD_ENCODING`.
+        """
+        missing = records.is_null().arg_true()
+        if not missing.is_empty():
+            holding = ""
+            if holdings is not None:
+                row = holdings.row(missing[0], named=True)
+                holding = f" of {row['product']!r} ({row['isin']})"
+            raise ValueError(f"Record{holding} is null: a value of the holding is missing")
+
+        overlong = records.filter(records.str.len_chars() > RECORD_LENGTH)
+        if not overlong.is_empty():
+            raise ValueError(f"Record longer than {RECORD_LENGTH} characters: {overlong[0]!r}")
+
+        padded = records.str.pad_end(RECORD_LENGTH).to_list()
+        try:
+            return "".join(f"{record}\r\n" for record in padded).encode(RECORD_ENCODING)
+        except UnicodeEncodeError as error:
+            record = padded[error.start // (RECORD_LENGTH + 2)]
+            raise ValueError(f"Record not representable in {RECORD_ENCODING}: {record.rstrip()!r}") from error
+
+    @staticmethod
+    def _transaction_prefix(info: GlobalInfo = GLOBAL_INFO) -> str:
+        """Returns the declarant fields shared by every transaction record.
+
+        Args:
+            info (GlobalInfo, optional): declarant of the model 720. Defaults to `GLOBAL_INFO`.
+
+        Returns:
+            str: beginning of the first part of a transaction record, up to its key.
+        """
+        return (
+            f"2720"
+            f"{info.year}"
+            f"{info.dni_number}"
+            f"{info.dni_number}"
+            f"{' ' * 9}"
+            f"{f'{info.surnames} {info.name}'.ljust(40)}"
+            "1"
+            f"{' ' * 25}"
+        )
 
     @staticmethod
-    def get_transaction_record(row: dict, option: str = "A") -> tuple[str, str]:
+    def _cents(col: str, width: int) -> pl.Expr:
+        """Renders a euro column as a zero-padded integer amount of cents, truncated like `int`."""
+        return (pl.col(col) * 100).cast(pl.Int64).cast(pl.Utf8).str.zfill(width)
+
+    @classmethod
+    def render_transaction_records(
+        cls, df: pl.DataFrame, option: str = "A", info: GlobalInfo = GLOBAL_INFO
+    ) -> list[str]:
+        """Renders the transaction records of a dataframe in a single columnar pass.
+
+        Produces the same strings as calling `get_transaction_record` on every row.
+
+        Args:
+            df (pl.DataFrame): dataframe with `broker_country_id`, `isin`, `product`, `eur_value` and `amount`,
+                and optionally `key` and `subkey`.
+            option (str, optional): "A", "M" or "C". Defaults to "A".
+            info (GlobalInfo, optional): declarant of the model 720. Defaults to `GLOBAL_INFO`.
+
+        Returns:
+            list[str]: both parts of the transaction record of each row, in row order.
+        """
+        if df.is_empty():
+            return []
+        df = cls.with_default_keys(df)
+
+        transaction_sub1, transaction_sub2 = cls._transaction_exprs(option, info)
+        return df.select(pl.concat_list([transaction_sub1, transaction_sub2]).explode()).to_series().to_list()
+
+    @classmethod
+    def _transaction_exprs(cls, option: str, info: GlobalInfo = GLOBAL_INFO) -> tuple[pl.Expr, pl.Expr]:
+        """Builds the expressions rendering both parts of a transaction record.
+
+        Args:
+            option (str): "A", "M" or "C".
+            info (GlobalInfo, optional): declarant of the model 720. Defaults to `GLOBAL_INFO`.
+
+        Returns:
+            tuple[pl.Expr, pl.Expr]: expressions of the two parts of the transaction record.
+        """
+        assert option in ["A", "M", "C"], "Option must be 'A', 'M', or 'C'"
+        transaction_sub1 = pl.concat_str(
+            [
+                pl.lit(cls._transaction_prefix(info)),
+                pl.col("key"),
+                pl.col("subkey"),
+                pl.lit(" " * 25),
+                pl.col("broker_country_id"),
+                pl.lit("1"),
+                pl.col("isin"),
+                pl.lit(" " * 46),
+                pl.col("product").str.pad_end(40),
+            ]
+        )
+        transaction_sub2 = pl.concat_str(
+            [
+                pl.col("isin").str.slice(0, 2),
+                pl.lit(f"{0:08}A{0:08} "),
+                cls._cents("eur_value", 14),
+                pl.lit(f" {0:014}{option}"),
+                cls._cents("amount", 12),
+                pl.lit(f" {int(100 * 100):05}"),
+            ]
+        )
+        return transaction_sub1, transaction_sub2
+
+    @staticmethod
+    def get_transaction_record(row: dict, option: str = "A", info: GlobalInfo = GLOBAL_INFO) -> tuple[str, str]:
         """Gets the string corresponding to a transaction record.
 
         Args:
             row (dict): dictionary containing the dataframe row of interest.
             option (str, optional): "A", "M" or "C". Defaults to "A".
+            info (GlobalInfo, optional): declarant of the model 720. Defaults to `GLOBAL_INFO`.
 
         Returns:
             tuple[str, str]: tuple of strings containing the two parts of the transaction record.
@@ -240,14 +838,14 @@ class GlobalCompute:
         assert option in ["A", "M", "C"], "Option must be 'A', 'M', or 'C'"
         transaction_sub1 = (
             f"2720"
-            f"{GLOBAL_INFO.year}"
-            f"{GLOBAL_INFO.dni_number}"
-            f"{GLOBAL_INFO.dni_number}"
+            f"{info.year}"
+            f"{info.dni_number}"
+            f"{info.dni_number}"
             f"{' ' * 9}"
-            f"{f'{GLOBAL_INFO.surnames} {GLOBAL_INFO.name}'.ljust(40)}"
+            f"{f'{info.surnames} {info.name}'.ljust(40)}"
             "1"
             f"{' ' * 25}"
-            "V1"
+            f"{row.get('key', 'V')}{row.get('subkey', '1')}"
             f"{' ' * 25}"
             f"{row['broker_country_id']}"
             "1"
@@ -268,14 +866,14 @@ class GlobalCompute:
         return (transaction_sub1, transaction_sub2)
 
     @staticmethod
-    def get_header(declared_values: int, total_amount: float) -> str:
+    def get_header(declared_values: int, total_amount: float, info: GlobalInfo = GLOBAL_INFO) -> str:
         header = (
             f"1720"
-            f"{GLOBAL_INFO.year}"
-            f"{GLOBAL_INFO.dni_number}"
-            f"{f'{GLOBAL_INFO.surnames} {GLOBAL_INFO.name}'.ljust(40)}"
-            f"T{GLOBAL_INFO.telephone}"
-            f"{f'{GLOBAL_INFO.surnames} {GLOBAL_INFO.name}'.ljust(40)}"
+            f"{info.year}"
+            f"{info.dni_number}"
+            f"{f'{info.surnames} {info.name}'.ljust(40)}"
+            f"T{info.telephone}"
+            f"{f'{info.surnames} {info.name}'.ljust(40)}"
             f"{7200000000000:013d}"
             f"{' ' * 2}"
             f"{declared_values:022}"
@@ -290,37 +888,62 @@ class GlobalCompute:
         """Computes the difference between current and previous data,
         assigning an 'order_type' based on presence in each DataFrame.
 
-        - 'A' → product only in current data (self.data)
-        - 'C' → product only in old data (self.old_data)
-        - 'M' → product in both current and old data
+        - 'A' → holding only in current data (self.data)
+        - 'C' → holding only in old data (self.old_data)
+        - 'M' → holding in both current and old data
 
         Returns:
             pl.DataFrame: updated data including the 'order_type' column.
         """
-        old_products = set(self.old_data.get_column("product").to_list())
+        with span("compute.diff") as diff_span:
+            diff = HoldingsDiff(self.data, self.old_data)
+            data = diff.current
+            missing_old_data = diff.closed
+            if missing_old_data.height > 0:
+                # The closed holdings were sold during the year, so the activity files know their instruments
+                closed = self.activity_instruments.classify(missing_old_data.drop(["key", "subkey"]))
+                missing_old_data = closed.select(missing_old_data.columns)
+                proceeds = self.closed_proceeds(missing_old_data)
+                missing_old_data = missing_old_data.join(proceeds, on=["isin", "broker_country_id"], how="left")
+                # Adds additional column with null values
+                data = data.with_columns([pl.lit(None).cast(pl.Float64).alias("Proceeds_EUR")])
+
+            # Concatenate both
+            df = pl.concat([data, missing_old_data], how="vertical")
+            diff_span.rows = df.height
 
-        # Assign order type to current data
-        data = self.data.with_columns(
-            pl.col("product").map_elements(lambda product: "M" if product in old_products else "A").alias("order_type")
-        )
-
-        # Get products only in old data (not in current)
-        missing_old_data = self.old_data.filter(~pl.col("product").is_in(data["product"])).with_columns(
-            pl.lit("C").alias("order_type")
-        )
+        return df
 
-        if missing_old_data.height > 0:
-            # For example, join with `self.lookup_df` on 'product'
-            from modelo720.ibkr import IbkrActivity
+    def closed_proceeds(self, closed_data: pl.DataFrame) -> pl.DataFrame:
+        """Gets the EUR sale proceeds of the closed holdings from the activity files of the current year.
 
-            act = IbkrActivity("datasets/Activity2024_IBKR.csv", "r")
-            missing_old_data = missing_old_data.join(
-                act.exit_data.select(["isin", "Proceeds_EUR"]), on="isin", how="left"
-            )
-            # Adds additional column with null values
-            data = data.with_columns([pl.lit(None).cast(pl.Float64).alias("Proceeds_EUR")])
+        Only the statements of the brokers of the closed holdings are parsed, and only the trades of their
+        ISINs are converted.
 
-        # Concatenate both
-        df = pl.concat([data, missing_old_data], how="vertical")
+        Args:
+            closed_data (pl.DataFrame): holdings only in old data, with `isin` and `broker_country_id` columns.
 
-        return df
+        Returns:
+            pl.DataFrame: `isin`, `broker_country_id` and `Proceeds_EUR` of the closed holdings sold.
+        """
+        frames = []
+        for config in self.config:
+            if config.activity_file is None:
+                continue
+            activity = next((entry for entry in readers("activity") if entry.broker == config.broker), None)
+            if activity is None:
+                raise ValueError(f"Activity files are not supported for '{config.broker}'.")
+
+            country = get_reader(config.broker).info.country
+            isins = closed_data.filter(pl.col("broker_country_id") == country)["isin"].unique()
+            if isins.is_empty():
+                continue
+            with span("compute.proceeds", file=config.activity_file) as proceeds_span:
+                proceeds = activity.factory(Path(config.activity_file), config.year).proceeds(isins)
+                proceeds_span.rows = len(proceeds)
+            frames.append(proceeds.select(["isin", pl.lit(country).alias("broker_country_id"), pl.col("Proceeds_EUR")]))
+
+        if not frames:
+            logger.info("No activity file for the closed holdings, their proceeds are left empty")
+            return pl.DataFrame(schema={"isin": pl.Utf8, "broker_country_id": pl.Utf8, "Proceeds_EUR": pl.Float64})
+        return pl.concat(frames)
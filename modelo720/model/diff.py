@@ -0,0 +1,62 @@
+"""year-over-year diff of holdings for the model 720."""
+
+from functools import cached_property
+
+import polars as pl
+
+from .references import DIFF_KEYS
+
+
+class HoldingsDiff:
+    """Classifies the holdings of two consecutive years with hash joins on their key columns.
+
+    - 'A' → holding only in current data
+    - 'M' → holding in both current and old data
+    - 'C' → holding only in old data
+    """
+
+    def __init__(self, data: pl.DataFrame, old_data: pl.DataFrame, keys: list[str] = DIFF_KEYS):
+        """Initializes the diff. Nothing is joined until a result is accessed.
+
+        Args:
+            data (pl.DataFrame): holdings of the current year.
+            old_data (pl.DataFrame): holdings of the previous year.
+            keys (list[str], optional): columns identifying a holding. Defaults to `DIFF_KEYS`.
+        """
+        self.data = data
+        self.old_data = old_data
+        self.keys = keys
+
+    @cached_property
+    def current(self) -> pl.DataFrame:
+        """Returns the current holdings with an `order_type` column, 'M' if held the previous year else 'A'.
+
+        Returns:
+            pl.DataFrame: current data, in its original order.
+        """
+        old_keys = self.old_data.select(self.keys).unique().with_columns(pl.lit("M").alias("order_type"))
+        return self.data.join(old_keys, on=self.keys, how="left", maintain_order="left").with_columns(
+            pl.col("order_type").fill_null("A")
+        )
+
+    @cached_property
+    def kept(self) -> pl.DataFrame:
+        """Returns the old rows of the holdings still held, each with the values of the first old row of its holding.
+
+        Returns:
+            pl.DataFrame: old data of the 'M' holdings, in its original order.
+        """
+        return self.old_data.join(self.data.select(self.keys), on=self.keys, how="semi").with_columns(
+            pl.all().exclude(self.keys).first().over(self.keys)
+        )
+
+    @cached_property
+    def closed(self) -> pl.DataFrame:
+        """Returns the old holdings no longer held, with an `order_type` column set to 'C'.
+
+        Returns:
+            pl.DataFrame: old data of the 'C' holdings, in its original order.
+        """
+        return self.old_data.join(self.data.select(self.keys), on=self.keys, how="anti").with_columns(
+            pl.lit("C").alias("order_type")
+        )
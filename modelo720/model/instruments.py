@@ -0,0 +1,207 @@
+"""instrument metadata of the holdings of the model 720.
+
+The index maps every known ISIN to its asset class and model 720 key and subkey. It is built from the
+"Financial Instrument Information" of the activity statements, and ISINs it does not hold are classified by
+ISIN prefix. Holdings are then filtered and keyed with a single hash join on `isin`, and the
+index can be saved and loaded as an Arrow IPC file to reuse it across runs:
+
+    index = InstrumentIndex.from_activity("Activity2024_IBKR.csv", 2024)
+    index.save("instruments.arrow")  # later: MODELO720_INSTRUMENTS=instruments.arrow
+
+Products matching an optional regex, such as the option contracts of `OPTION_PRODUCT_PATTERN`, are not
+classified by prefix when their ISIN is unknown:
+
+    configure_instrument_index(InstrumentIndex(product_pattern=OPTION_PRODUCT_PATTERN))
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import TypeVar
+
+import polars as pl
+
+from modelo720.registry import readers
+
+from .references import (
+    DECLARATION_KEYS,
+    DEFAULT_ASSET_CLASS,
+    ISIN_LENGTH,
+    ISIN_PREFIX_CLASSES,
+)
+
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
+
+INSTRUMENTS_ENV_VAR = "MODELO720_INSTRUMENTS"
+# Model 720 key and subkey, as enums so keying and filtering the holdings never copies strings
+KEY_DTYPE = pl.Enum(sorted({key for key, _ in DECLARATION_KEYS.values()}))
+SUBKEY_DTYPE = pl.Enum(sorted({subkey for _, subkey in DECLARATION_KEYS.values()}))
+INSTRUMENT_SCHEMA = {
+    "isin": pl.Utf8,
+    "asset_class": pl.Utf8,
+    "key": KEY_DTYPE,
+    "subkey": SUBKEY_DTYPE,
+}
+
+_CLASS_KEYS = {asset_class: key for asset_class, (key, _) in DECLARATION_KEYS.items()}
+_CLASS_SUBKEYS = {asset_class: subkey for asset_class, (_, subkey) in DECLARATION_KEYS.items()}
+_PREFIX_KEYS = {prefix: DECLARATION_KEYS[asset_class][0] for prefix, asset_class in ISIN_PREFIX_CLASSES.items()}
+_PREFIX_SUBKEYS = {prefix: DECLARATION_KEYS[asset_class][1] for prefix, asset_class in ISIN_PREFIX_CLASSES.items()}
+_DEFAULT_KEY, _DEFAULT_SUBKEY = DECLARATION_KEYS[DEFAULT_ASSET_CLASS]
+
+
+class InstrumentIndex:
+    """Index of the asset class and model 720 key of the known instruments, keyed on ISIN."""
+
+    def __init__(self, frame: pl.DataFrame | None = None, product_pattern: str | None = None):
+        """Initializes the index.
+
+        Args:
+            frame (pl.DataFrame, optional): `isin` and `asset_class` of the instruments; later rows override
+                earlier rows of the same ISIN. Defaults to an empty index.
+            product_pattern (str, optional): regex of the products not declared when their ISIN is not in the
+                index, e.g. `OPTION_PRODUCT_PATTERN`. Defaults to None, which classifies them by ISIN prefix.
+        """
+        self.product_pattern = product_pattern
+        frame = frame if frame is not None else pl.DataFrame(schema={"isin": pl.Utf8, "asset_class": pl.Utf8})
+        classes = frame.select(["isin", "asset_class"]).unique("isin", keep="last", maintain_order=True)
+        self.frame = classes.with_columns(
+            pl.col("asset_class").replace_strict(_CLASS_KEYS, default=None, return_dtype=KEY_DTYPE).alias("key"),
+            pl.col("asset_class")
+            .replace_strict(_CLASS_SUBKEYS, default=None, return_dtype=SUBKEY_DTYPE)
+            .alias("subkey"),
+        ).cast(INSTRUMENT_SCHEMA)
+
+    @classmethod
+    def from_activity(cls, file_path: str | Path, year: int, broker: str = "ibkr") -> "InstrumentIndex":
+        """Builds the index of the instruments of an activity statement.
+
+        Args:
+            file_path (Union[str, Path]): file path of the activity statement
+            year (int): year of the statement
+            broker (str, optional): broker of the statement. Defaults to "ibkr".
+
+        Returns:
+            InstrumentIndex: index of the instruments with an ISIN.
+
+        Raises:
+            ValueError: If the broker has no activity reader.
+        """
+        activity = next((entry for entry in readers("activity") if entry.broker == broker), None)
+        if activity is None:
+            raise ValueError(f"Activity files are not supported for '{broker}'.")
+        return cls(activity.factory(Path(file_path), year).asset_classes)
+
+    @classmethod
+    def load(cls, file_path: str | Path) -> "InstrumentIndex":
+        """Loads an index saved with `save`.
+
+        Args:
+            file_path (Union[str, Path]): file path of the Arrow IPC index
+
+        Returns:
+            InstrumentIndex: the loaded index.
+        """
+        return cls(pl.read_ipc(file_path, memory_map=False))
+
+    def save(self, file_path: str | Path) -> None:
+        """Saves the index as an Arrow IPC file.
+
+        Args:
+            file_path (Union[str, Path]): file path of the index
+        """
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        self.frame.write_ipc(file_path)
+
+    def merge(self, other: "InstrumentIndex") -> "InstrumentIndex":
+        """Combines two indexes.
+
+        Args:
+            other (InstrumentIndex): index whose instruments override those of this one
+
+        Returns:
+            InstrumentIndex: the combined index.
+        """
+        return InstrumentIndex(pl.concat([self.frame, other.frame]), other.product_pattern or self.product_pattern)
+
+    def __len__(self) -> int:
+        return self.frame.height
+
+    def classify(self, df: FrameT) -> FrameT:
+        """Keeps the holdings declared in the model 720 and adds their `key` and `subkey` columns.
+
+        The holdings are joined on `isin` with the index; the ISINs of `ISIN_LENGTH` characters it does not hold
+        take the keys of their prefix in `ISIN_PREFIX_CLASSES`, or of `DEFAULT_ASSET_CLASS`, unless their product
+        matches the `product_pattern` of the index. Holdings whose asset class has no model 720 key
+        (options, futures, warrants, CFDs...), or without an ISIN, are removed.
+
+        Args:
+            df (pl.DataFrame | pl.LazyFrame): holdings with `isin` and `product` columns
+
+        Returns:
+            pl.DataFrame | pl.LazyFrame: declared holdings, in their original order.
+        """
+        prefix = pl.col("isin").str.slice(0, 2)
+        unknown = pl.col("asset_class").is_null() & (pl.col("isin").str.len_bytes() == ISIN_LENGTH)
+        if self.product_pattern is not None:
+            unknown &= ~pl.col("product").str.contains(self.product_pattern).fill_null(False)
+        lf = (
+            df.lazy()
+            .join(
+                self.frame.lazy().select(["isin", "asset_class", "key", "subkey"]),
+                on="isin",
+                how="left",
+                maintain_order="left",
+            )
+            .with_columns(
+                pl.when(unknown)
+                .then(prefix.replace_strict(_PREFIX_KEYS, default=_DEFAULT_KEY, return_dtype=KEY_DTYPE))
+                .otherwise(pl.col("key"))
+                .alias("key"),
+                pl.when(unknown)
+                .then(prefix.replace_strict(_PREFIX_SUBKEYS, default=_DEFAULT_SUBKEY, return_dtype=SUBKEY_DTYPE))
+                .otherwise(pl.col("subkey"))
+                .alias("subkey"),
+            )
+            .filter(pl.col("key").is_not_null())
+            .drop("asset_class")
+        )
+        return lf if isinstance(df, pl.LazyFrame) else lf.collect()
+
+
+_INSTRUMENT_INDEX: InstrumentIndex | None = None
+_INSTRUMENT_INDEX_LOCK = threading.Lock()
+
+
+def get_instrument_index() -> InstrumentIndex:
+    """Returns the process-wide instrument index, loaded from `MODELO720_INSTRUMENTS` when it is set.
+
+    Returns:
+        InstrumentIndex: shared index, empty unless configured.
+    """
+    global _INSTRUMENT_INDEX
+    with _INSTRUMENT_INDEX_LOCK:
+        if _INSTRUMENT_INDEX is None:
+            path = os.environ.get(INSTRUMENTS_ENV_VAR)
+            _INSTRUMENT_INDEX = InstrumentIndex.load(path) if path else InstrumentIndex()
+    return _INSTRUMENT_INDEX
+
+
+def configure_instrument_index(index: InstrumentIndex | str | Path | None) -> InstrumentIndex:
+    """Replaces the process-wide instrument index.
+
+    Args:
+        index (Union[InstrumentIndex, str, Path], optional): index, or file path of a saved index. None resets
+            it to an empty index.
+
+    Returns:
+        InstrumentIndex: the new shared index.
+    """
+    global _INSTRUMENT_INDEX
+    if index is None:
+        index = InstrumentIndex()
+    elif not isinstance(index, InstrumentIndex):
+        index = InstrumentIndex.load(index)
+    with _INSTRUMENT_INDEX_LOCK:
+        _INSTRUMENT_INDEX = index
+    return _INSTRUMENT_INDEX
@@ -0,0 +1,142 @@
+"""validation of the ISINs of the holdings of the model 720.
+
+ISINs are normalized and checked on the whole column with native Polars expressions: length, charset, country
+prefix and check digit. Each ISIN is parsed once as a base-36 number, which fits in 64 bits, and its country
+and check digit are computed from it with integer arithmetic, so no row is ever handled in Python. Holdings
+with an invalid ISIN are set aside in a rejects report instead of reaching the declaration file:
+
+    holdings, rejects = split_invalid_isins(df.with_columns(normalize_isin()))
+"""
+
+import polars as pl
+
+from .references import ISIN_COUNTRIES, ISIN_LENGTH
+
+# Column of the rejects report holding why each ISIN is invalid
+REJECT_REASON = "reason"
+
+_BASE = 36
+_PAYLOAD_LENGTH = ISIN_LENGTH - 1
+_LIMB = 4
+_NUMBER = "__isin_number"
+_VALUE = "__isin_value_{}"
+_DOUBLED = "__isin_doubled_{}"
+
+
+def _luhn_table() -> list[int]:
+    """Returns the Luhn contribution of every base-36 character value, then of the same values doubled.
+
+    Letters count as two digits (A = 10 ... Z = 35); when the character is doubled, only its last digit is.
+    """
+
+    def term(digit: int, doubled: bool) -> int:
+        return digit * 2 - 9 * (digit >= 5) if doubled else digit
+
+    return [
+        term(value % 10, doubled) + term(value // 10, not doubled)
+        for doubled in (False, True)
+        for value in range(_BASE)
+    ]
+
+
+_LUHN_TABLE = _luhn_table()
+
+
+def normalize_isin(col: str = "isin") -> pl.Expr:
+    """Strips the whitespace around ISINs and upper-cases them; empty ISINs become null.
+
+    Args:
+        col (str, optional): column of the ISINs. Defaults to "isin".
+
+    Returns:
+        pl.Expr: normalized ISINs, named `col`.
+    """
+    stripped = pl.col(col).str.strip_chars()
+    return pl.when(stripped.str.len_bytes() > 0).then(stripped.str.to_uppercase()).alias(col)
+
+
+def _country_codes() -> list[int]:
+    """Returns the base-36 values of the two-letter prefixes of `ISIN_COUNTRIES`."""
+    return sorted(int(country, _BASE) for country in ISIN_COUNTRIES)
+
+
+def with_isin_errors(df: pl.DataFrame | pl.LazyFrame, col: str = "isin") -> pl.DataFrame | pl.LazyFrame:
+    """Adds the `REJECT_REASON` column, naming the first check each ISIN fails, or null when it is valid.
+
+    Args:
+        df (pl.DataFrame | pl.LazyFrame): holdings with normalized, non-null ISINs
+        col (str, optional): column of the ISINs. Defaults to "isin".
+
+    Returns:
+        pl.DataFrame | pl.LazyFrame: holdings with their reason: "length", "charset", "country" or
+            "check digit".
+    """
+    number = pl.col(_NUMBER)
+    value = [pl.col(_VALUE.format(position)) for position in range(ISIN_LENGTH)]
+    doubled = [pl.col(_DOUBLED.format(position)) for position in range(_PAYLOAD_LENGTH)]
+    # Characters are extracted from limbs of `_LIMB` characters with 32-bit arithmetic, much cheaper than 64-bit
+    limbs = [
+        (number // _BASE ** (ISIN_LENGTH - _LIMB * (limb + 1)) % _BASE**_LIMB).cast(pl.Int32)
+        for limb in range(ISIN_LENGTH // _LIMB)
+    ]
+    values = [
+        (limbs[position // _LIMB] // _BASE ** (_LIMB - 1 - position % _LIMB) % _BASE)
+        .cast(pl.Int16)
+        .alias(_VALUE.format(position))
+        for position in range(ISIN_LENGTH)
+    ]
+    # Every other digit is doubled from the rightmost one; letters are two digits, so only digits flip the parity
+    parity = [pl.lit(True).alias(_DOUBLED.format(_PAYLOAD_LENGTH - 1))]
+    parity += [
+        (doubled[position + 1] ^ (value[position + 1] < 10)).alias(_DOUBLED.format(position))
+        for position in reversed(range(_PAYLOAD_LENGTH - 1))
+    ]
+    table = pl.lit(pl.Series(_LUHN_TABLE, dtype=pl.Int16))
+    total = pl.sum_horizontal(
+        table.gather(value[position] + _BASE * doubled[position].cast(pl.Int16)) for position in range(_PAYLOAD_LENGTH)
+    )
+    check = value[ISIN_LENGTH - 1]
+    country = value[0].cast(pl.Int32) * _BASE + value[1]
+    reason = (
+        pl.when(pl.col(col).str.len_chars() != ISIN_LENGTH)
+        .then(pl.lit("length"))
+        # The base-36 parser accepts a leading sign: "-" yields a negative number, "+" a prefix out of the countries
+        .when(number.is_null() | (number < 0) | (check >= 10))
+        .then(pl.lit("charset"))
+        .when(~country.is_in(_country_codes()))
+        .then(pl.lit("country"))
+        .when((10 - total % 10) % 10 != check)
+        .then(pl.lit("check digit"))
+        .otherwise(pl.lit(None, dtype=pl.Utf8))
+        .alias(REJECT_REASON)
+    )
+
+    checked = (
+        df.lazy().with_columns(pl.col(col).str.to_integer(base=_BASE, strict=False).alias(_NUMBER)).with_columns(values)
+    )
+    for column in parity:
+        checked = checked.with_columns(column)
+    internal = [_NUMBER, *(_VALUE.format(position) for position in range(ISIN_LENGTH))]
+    internal += [_DOUBLED.format(position) for position in range(_PAYLOAD_LENGTH)]
+    checked = checked.with_columns(reason).drop(internal)
+    return checked if isinstance(df, pl.LazyFrame) else checked.collect()
+
+
+def split_invalid_isins(
+    df: pl.DataFrame | pl.LazyFrame, col: str = "isin"
+) -> tuple[pl.DataFrame | pl.LazyFrame, pl.DataFrame | pl.LazyFrame]:
+    """Splits holdings between those with a valid ISIN and the rejected ones.
+
+    Args:
+        df (pl.DataFrame | pl.LazyFrame): holdings with normalized, non-null ISINs
+        col (str, optional): column of the ISINs. Defaults to "isin".
+
+    Returns:
+        tuple[pl.DataFrame | pl.LazyFrame, pl.DataFrame | pl.LazyFrame]: holdings with a valid ISIN, and the
+            rejected holdings with their `REJECT_REASON`.
+    """
+    checked = with_isin_errors(df, col)
+    if isinstance(checked, pl.LazyFrame):
+        checked = checked.cache()
+    valid = checked.filter(pl.col(REJECT_REASON).is_null()).drop(REJECT_REASON)
+    return valid, checked.filter(pl.col(REJECT_REASON).is_not_null())
@@ -40,3 +40,98 @@ GLOBAL_INFO = GlobalInfo(
     telephone="676767676",
     ownership_percentage=100.0,
 )
+
+# Columns identifying a holding across years: the same security held at two brokers is two holdings
+DIFF_KEYS = ["isin", "broker_country_id"]
+
+# Layout of the file submitted to the AEAT: fixed-length records in ISO-8859-1, each ended by CRLF
+RECORD_LENGTH = 500
+RECORD_ENCODING = "iso-8859-1"
+RECORD_BATCH_SIZE = 10_000
+# Suffix of the file written next to every declaration file with the FX rates version used to value it
+METADATA_SUFFIX = ".meta.json"
+
+# Fields of the records of the declaration file: 1-based start, length and format matching exactly the field
+_TEXT = r"[\x20-\x7E\xA0-\xFF]"  # printable characters of `RECORD_ENCODING`
+_NIF = "[0-9A-Z]{9}"
+HEADER_LAYOUT = {
+    "type": (1, 1, "1"),
+    "model": (2, 3, "720"),
+    "year": (5, 4, "[0-9]{4}"),
+    "declarant_nif": (9, 9, _NIF),
+    "declarant_name": (18, 40, _TEXT + "{40}"),
+    "support": (58, 1, "[TC]"),
+    "telephone": (59, 9, "[0-9]{9}"),
+    "contact_name": (68, 40, _TEXT + "{40}"),
+    "declaration_id": (108, 13, "720[0-9]{10}"),
+    "replacement": (121, 2, "[ C][ S]"),
+    "previous_declaration_id": (123, 13, "[0-9]{13}"),
+    "records": (136, 9, "[0-9]{9}"),
+    "valuation_1_sign": (145, 1, "[ N]"),
+    "valuation_1": (146, 17, "[0-9]{17}"),
+    "valuation_2_sign": (163, 1, "[ N]"),
+    "valuation_2": (164, 17, "[0-9]{17}"),
+    "blank": (181, 320, " {320}"),
+}
+TRANSACTION_LAYOUT = {
+    "type": (1, 1, "2"),
+    "model": (2, 3, "720"),
+    "year": (5, 4, "[0-9]{4}"),
+    "declarant_nif": (9, 9, _NIF),
+    "declared_nif": (18, 9, _NIF),
+    "representative_nif": (27, 9, r"[0-9A-Z ]{9}"),
+    "declared_name": (36, 40, _TEXT + "{40}"),
+    "condition": (76, 1, "[1-8]"),
+    "ownership_type": (77, 25, _TEXT + "{25}"),
+    "key": (102, 1, "[BCISV]"),
+    "subkey": (103, 1, "[0-5]"),
+    "right_type": (104, 25, _TEXT + "{25}"),
+    "country": (129, 2, "[A-Z]{2}"),
+    "identification_key": (131, 1, "[12]"),
+    "security_id": (132, 12, "[0-9A-Z ]{12}"),
+    "entity_id": (144, 46, _TEXT + "{46}"),
+    "entity_name": (190, 40, _TEXT + "{40}"),
+    "entity_country": (230, 2, "[A-Z]{2}"),
+    "acquisition_date": (232, 8, "[0-9]{8}"),
+    "origin": (240, 1, "[AMC]"),
+    "extinction_date": (241, 8, "[0-9]{8}"),
+    "valuation_1_sign": (249, 1, "[ N]"),
+    "valuation_1": (250, 14, "[0-9]{14}"),
+    "valuation_2_sign": (264, 1, "[ N]"),
+    "valuation_2": (265, 14, "[0-9]{14}"),
+    "order_type": (279, 1, "[AMC]"),
+    "quantity": (280, 12, "[0-9]{12}"),
+    "property_key": (292, 1, "[ A-Z]"),
+    "ownership_percentage": (293, 5, "[0-9]{5}"),
+    "blank": (298, 203, " {203}"),
+}
+
+# Key and subkey of the model 720 of each declared asset class: shares (V/1), debt (V/2) and collective
+# investment undertakings (I/0). Other classes (options, futures, warrants, CFDs...) are not declared.
+DECLARATION_KEYS = {
+    "stock": ("V", "1"),
+    "bond": ("V", "2"),
+    "etf": ("I", "0"),
+    "fund": ("I", "0"),
+}
+# Asset class of the ISINs not in the instrument index, by ISIN prefix: international and EU bonds
+ISIN_PREFIX_CLASSES = {"XS": "bond", "EU": "bond"}
+DEFAULT_ASSET_CLASS = "stock"
+# Product name of the option contracts, e.g. "TSLA 17JAN25 300 P", to set as the `product_pattern` of an instrument
+# index that should not declare them when their ISIN is unknown
+OPTION_PRODUCT_PATTERN = r"\b[A-Z]{1,6} \d{2}[A-Z]{3}\d{2} \d+(\.\d+)? [CP]\b"
+# Length of an ISIN: country code, 9 alphanumeric characters and a check digit
+ISIN_LENGTH = 12
+# Prefixes of valid ISINs: the ISO 3166-1 alpha-2 country codes, plus the codes assigned to international
+# securities (XS, XA-XD), to the European Union (EU) and to Kosovo (XK)
+_ISIN_COUNTRY_CODES = """
+    AD AE AF AG AI AL AM AO AQ AR AS AT AU AW AX AZ BA BB BD BE BF BG BH BI BJ BL BM BN BO BQ BR BS BT BV BW BY
+    BZ CA CC CD CF CG CH CI CK CL CM CN CO CR CU CV CW CX CY CZ DE DJ DK DM DO DZ EC EE EG EH ER ES ET FI FJ FK
+    FM FO FR GA GB GD GE GF GG GH GI GL GM GN GP GQ GR GS GT GU GW GY HK HM HN HR HT HU ID IE IL IM IN IO IQ IR
+    IS IT JE JM JO JP KE KG KH KI KM KN KP KR KW KY KZ LA LB LC LI LK LR LS LT LU LV LY MA MC MD ME MF MG MH MK
+    ML MM MN MO MP MQ MR MS MT MU MV MW MX MY MZ NA NC NE NF NG NI NL NO NP NR NU NZ OM PA PE PF PG PH PK PL PM
+    PN PR PS PT PW PY QA RE RO RS RU RW SA SB SC SD SE SG SH SI SJ SK SL SM SN SO SR SS ST SV SX SY SZ TC TD TF
+    TG TH TJ TK TL TM TN TO TR TT TV TW TZ UA UG UM US UY UZ VA VC VE VG VI VN VU WF WS YE YT ZA ZM ZW
+    EU XA XB XC XD XK XS
+"""
+ISIN_COUNTRIES = frozenset(_ISIN_COUNTRY_CODES.split())
@@ -0,0 +1,176 @@
+"""persistent store of the filed declarations of the model 720.
+
+Each declaration written with a store records its holdings in a SQLite database, as an Arrow IPC blob keyed
+on the declarant and the year, with the FX snapshot version used to value them. The following year,
+`GlobalCompute` reads the previous holdings from the store instead of parsing and converting the previous
+year exports again:
+
+    store = DeclarationStore("modelo720.db")
+    GlobalCompute(configs_2023, store=store).write_financial_record("modelo720_2023.720")
+    GlobalCompute(configs_2024, store=store).write_financial_record("modelo720_2024.720", with_previous=True)
+"""
+
+import io
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+
+from .instruments import KEY_DTYPE, SUBKEY_DTYPE
+
+# Columns of the recorded holdings, as loaded by the readers plus their model 720 key and order type
+STORE_HOLDINGS_SCHEMA = {
+    "product": pl.Utf8,
+    "isin": pl.Utf8,
+    "amount": pl.Float64,
+    "eur_value": pl.Float64,
+    "broker_country_id": pl.Utf8,
+    "key": KEY_DTYPE,
+    "subkey": SUBKEY_DTYPE,
+    "order_type": pl.Utf8,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS declarations (
+    declarant TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    fx_version TEXT NOT NULL,
+    holdings INTEGER NOT NULL,
+    total_eur REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (declarant, year)
+);
+"""
+
+
+class DeclarationStore:
+    """SQLite store of the holdings of the filed declarations."""
+
+    def __init__(self, path: str | Path):
+        """Initializes the store, creating the database and its tables when missing.
+
+        Args:
+            path (Union[str, Path]): file path of the SQLite database
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Opens a connection, committing its transaction on success and rolling it back on error."""
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            yield connection
+
+    def save(self, declarant: str, year: int, holdings: pl.DataFrame, fx_version: str) -> int:
+        """Records the holdings of a declaration, replacing any previous declaration of the declarant and year.
+
+        Args:
+            declarant (str): NIF of the declarant
+            year (int): year of the declaration
+            holdings (pl.DataFrame): declared holdings, with the `STORE_HOLDINGS_SCHEMA` columns. `order_type`
+                defaults to "A" when missing, `key` and `subkey` to null.
+            fx_version (str): version of the FX rates used to value the holdings
+
+        Returns:
+            int: number of holdings recorded.
+        """
+        if "order_type" not in holdings.columns:
+            holdings = holdings.with_columns(pl.lit("A").alias("order_type"))
+        for column in ("key", "subkey"):
+            if column not in holdings.columns:
+                holdings = holdings.with_columns(pl.lit(None, dtype=STORE_HOLDINGS_SCHEMA[column]).alias(column))
+        holdings = holdings.select(list(STORE_HOLDINGS_SCHEMA)).cast(STORE_HOLDINGS_SCHEMA)
+
+        data = io.BytesIO()
+        holdings.write_ipc(data)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO declarations "
+                "(declarant, year, fx_version, holdings, total_eur, created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    declarant,
+                    year,
+                    fx_version,
+                    holdings.height,
+                    holdings["eur_value"].sum(),
+                    datetime.now(UTC).isoformat(timespec="seconds"),
+                    data.getvalue(),
+                ),
+            )
+        return holdings.height
+
+    def has(self, declarant: str, year: int) -> bool:
+        """Checks whether a declaration of the declarant and year is recorded.
+
+        Args:
+            declarant (str): NIF of the declarant
+            year (int): year of the declaration
+
+        Returns:
+            bool: True when the declaration is recorded.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM declarations WHERE declarant = ? AND year = ?", (declarant, year)
+            ).fetchone()
+        return row is not None
+
+    def holdings(self, declarant: str, year: int) -> pl.DataFrame:
+        """Returns the recorded holdings of a declaration, in their declaration order.
+
+        Args:
+            declarant (str): NIF of the declarant
+            year (int): year of the declaration
+
+        Returns:
+            pl.DataFrame: holdings with the `STORE_HOLDINGS_SCHEMA` columns, `key` and `subkey` being null in
+                declarations recorded without them.
+
+        Raises:
+            ValueError: If the declaration is not recorded.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT data FROM declarations WHERE declarant = ? AND year = ?", (declarant, year)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"No declaration of {declarant} for year {year} in {self.path}")
+        holdings = pl.read_ipc(io.BytesIO(row[0]))
+        missing = [
+            pl.lit(None, dtype=dtype).alias(column)
+            for column, dtype in STORE_HOLDINGS_SCHEMA.items()
+            if column not in holdings.columns
+        ]
+        return holdings.with_columns(missing).select(list(STORE_HOLDINGS_SCHEMA))
+
+    def declarations(self, declarant: str | None = None) -> pl.DataFrame:
+        """Lists the recorded declarations.
+
+        Args:
+            declarant (str, optional): only lists the declarations of this NIF. Defaults to all of them.
+
+        Returns:
+            pl.DataFrame: declarant, year, FX version, number of holdings, total EUR value and creation time
+                of each declaration.
+        """
+        query = "SELECT declarant, year, fx_version, holdings, total_eur, created_at FROM declarations"
+        params: tuple = ()
+        if declarant is not None:
+            query, params = f"{query} WHERE declarant = ?", (declarant,)
+        with self._connect() as connection:
+            rows = connection.execute(f"{query} ORDER BY declarant, year", params).fetchall()
+        schema = {
+            "declarant": pl.Utf8,
+            "year": pl.Int64,
+            "fx_version": pl.Utf8,
+            "holdings": pl.Int64,
+            "total_eur": pl.Float64,
+            "created_at": pl.Utf8,
+        }
+        return pl.DataFrame(rows, schema=schema, orient="row")
@@ -0,0 +1,176 @@
+"""validation of the declaration files of the model 720.
+
+A declaration file, or the records of a declaration in memory, is loaded into a frame with one row per record
+and checked with vectorized expressions before it is submitted: record length and terminator, record type,
+format of every field of `HEADER_LAYOUT` and `TRANSACTION_LAYOUT`, ISINs, declarant of every record, and the
+number of records and total valuation declared in the header. Every error names its 1-based record number:
+
+    errors = validate_file("modelo720_2024.720")
+    if not errors.is_empty():
+        print(errors)
+"""
+
+from pathlib import Path
+
+import polars as pl
+
+from .isin import REJECT_REASON, with_isin_errors
+from .references import HEADER_LAYOUT, RECORD_ENCODING, RECORD_LENGTH, TRANSACTION_LAYOUT
+
+# Columns of the errors report
+ERRORS_SCHEMA = {"record": pl.UInt32, "field": pl.Utf8, "value": pl.Utf8, "error": pl.Utf8}
+RECORD_TERMINATOR = "\r\n"
+
+
+def _field(layout: dict[str, tuple[int, int, str]], name: str) -> pl.Expr:
+    """Returns the value of a field of the records."""
+    start, length, _ = layout[name]
+    return pl.col("line").str.slice(start - 1, length)
+
+
+def _errors(df: pl.DataFrame, field: str, value: pl.Expr, error: str | pl.Expr) -> pl.DataFrame:
+    """Builds the errors of the records of `df` in a field."""
+    return df.select(
+        pl.col("record"),
+        pl.lit(field).alias("field"),
+        value.cast(pl.Utf8).alias("value"),
+        (pl.lit(error) if isinstance(error, str) else error).alias("error"),
+    ).cast(ERRORS_SCHEMA)
+
+
+def _record_pattern(layout: dict[str, tuple[int, int, str]]) -> str:
+    """Returns the regex of the records of a layout.
+
+    As every format matches exactly the length of its field, a record matches the concatenation of the formats
+    only when all its fields are valid.
+    """
+    return "^" + "".join(f"(?:{pattern})" for _, _, pattern in layout.values()) + "$"
+
+
+def _field_errors(df: pl.DataFrame, layout: dict[str, tuple[int, int, str]]) -> pl.DataFrame:
+    """Checks every field of malformed records against the format of its layout."""
+    invalid = df.select(
+        pl.col("record"),
+        *(
+            pl.when(~_field(layout, name).str.contains(f"^(?:{pattern})$")).then(_field(layout, name)).alias(name)
+            for name, (_, _, pattern) in layout.items()
+        ),
+    )
+    return (
+        invalid.unpivot(index="record", variable_name="field")
+        .drop_nulls("value")
+        .with_columns(pl.lit("invalid format").alias("error"))
+        .cast(ERRORS_SCHEMA)
+    )
+
+
+def _signed_cents(layout: dict[str, tuple[int, int, str]], name: str) -> pl.Expr:
+    """Returns a valuation field as a signed integer amount of cents, null when not numeric.
+
+    The sign field precedes the valuation, so both are sliced at once: slicing costs as much as the offset.
+    """
+    start, length, _ = layout[f"{name}_sign"]
+    signed = pl.col("line").str.slice(start - 1, length + layout[name][1])
+    cents = signed.str.slice(length).cast(pl.Int64, strict=False)
+    return pl.when(signed.str.starts_with("N")).then(-cents).otherwise(cents)
+
+
+def validate_records(records: list[str] | pl.Series, tolerance_cents: int | None = None) -> pl.DataFrame:
+    """Validates the records of a declaration, without their line terminators.
+
+    Args:
+        records (Union[list[str], pl.Series]): header record followed by the transaction records
+        tolerance_cents (int, optional): difference allowed between the total valuation of the header and the
+            sum of the valuations of the transaction records. Defaults to one cent per transaction record, as
+            every record truncates its valuation to cents.
+
+    Returns:
+        pl.DataFrame: `record` number, `field`, offending `value` and `error` of every error found, in record
+            order; empty when the records are valid.
+    """
+    df = pl.DataFrame({"line": pl.Series(records, dtype=pl.Utf8)}).with_row_index("record", offset=1)
+    line = pl.col("line")
+    record_type = line.str.slice(0, 1)
+    header = df.head(1).filter(record_type == "1")
+    transactions = df.slice(1).filter(record_type == "2")
+
+    # Every record is checked against the regex of its layout in a single scan, and only the malformed ones are
+    # then checked field by field
+    malformed = pl.concat(
+        [
+            df.head(1).filter(~line.str.contains(_record_pattern(HEADER_LAYOUT))),
+            df.slice(1).filter(~line.str.contains(_record_pattern(TRANSACTION_LAYOUT))),
+        ]
+    )
+    expected_type = pl.when(pl.col("record") == 1).then(pl.lit("1")).otherwise(pl.lit("2"))
+    errors = [
+        _errors(df.filter(line.is_null()), "record", pl.lit(None), "record is null"),
+        _errors(
+            malformed.filter(line.str.len_chars() != RECORD_LENGTH),
+            "record",
+            line.str.len_chars(),
+            f"record length is not {RECORD_LENGTH}",
+        ),
+        _errors(
+            malformed.filter(line.str.contains(r"[\r\n]")), "record", pl.lit(None), "line terminator inside the record"
+        ),
+        _errors(
+            malformed.filter(record_type != expected_type),
+            "type",
+            record_type,
+            pl.format("record type is not {}", expected_type),
+        ),
+        _field_errors(malformed.filter((pl.col("record") == 1) & (record_type == "1")), HEADER_LAYOUT),
+        _field_errors(malformed.filter((pl.col("record") > 1) & (record_type == "2")), TRANSACTION_LAYOUT),
+    ]
+
+    isins = transactions.filter(_field(TRANSACTION_LAYOUT, "identification_key") == "1").select(
+        pl.col("record"), _field(TRANSACTION_LAYOUT, "security_id").alias("isin")
+    )
+    invalid_isins = with_isin_errors(isins).filter(pl.col(REJECT_REASON).is_not_null())
+    errors.append(_errors(invalid_isins, "security_id", pl.col("isin"), "invalid ISIN: " + pl.col(REJECT_REASON)))
+
+    if not header.is_empty():
+        for name in ("year", "declarant_nif"):
+            expected = header.select(_field(HEADER_LAYOUT, name)).item()
+            value = _field(TRANSACTION_LAYOUT, name)
+            mismatched = transactions.filter(value != expected)
+            errors.append(_errors(mismatched, name, value, f"differs from the header value {expected!r}"))
+
+        declared = header.select(_field(HEADER_LAYOUT, "records").cast(pl.Int64, strict=False)).item()
+        if declared != len(transactions):
+            error = f"declares {declared} records, the file has {len(transactions)}"
+            errors.append(_errors(header, "records", _field(HEADER_LAYOUT, "records"), error))
+
+        total = header.select(_signed_cents(HEADER_LAYOUT, "valuation_1")).item()
+        summed = transactions.lazy().select(_signed_cents(TRANSACTION_LAYOUT, "valuation_1").sum()).collect().item()
+        tolerance = len(transactions) if tolerance_cents is None else tolerance_cents
+        if total is not None and abs(total - summed) > tolerance:
+            error = f"total of {total} cents, the records sum {summed} cents"
+            errors.append(_errors(header, "valuation_1", _field(HEADER_LAYOUT, "valuation_1"), error))
+
+    return pl.concat(errors).sort("record", maintain_order=True)
+
+
+def validate_file(file_path: str | Path, tolerance_cents: int | None = None) -> pl.DataFrame:
+    """Validates a declaration file.
+
+    Args:
+        file_path (Union[str, Path]): file path of the declaration
+        tolerance_cents (int, optional): difference allowed between the total valuation of the header and the
+            sum of the valuations of the transaction records. Defaults to one cent per transaction record.
+
+    Returns:
+        pl.DataFrame: errors found, as returned by `validate_records`; empty when the file is valid.
+    """
+    records = Path(file_path).read_bytes().decode(RECORD_ENCODING).split(RECORD_TERMINATOR)
+    last = records.pop()
+    if not last:
+        return validate_records(records, tolerance_cents)
+
+    errors = validate_records([*records, last], tolerance_cents)
+    missing = pl.DataFrame(
+        {"record": [len(records) + 1], "field": ["record"], "value": [None], "error": ["missing line terminator"]},
+        schema=ERRORS_SCHEMA,
+    )
+    return pl.concat([errors, missing]).sort("record", maintain_order=True)
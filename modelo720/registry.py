@@ -0,0 +1,238 @@
+"""Registry of the broker export readers of modelo720.
+
+Every reader registers a cheap signature check run on the first `SNIFF_BYTES` of a file, so the broker of an
+export, or of every export of a directory, is detected without parsing it. The Degiro, IBKR and IBKR activity
+readers are built in; other brokers are added as plugins, either by calling `register_reader` or through a
+`modelo720.readers` entry point naming a callable that registers them:
+
+    register_reader(
+        ReaderEntry(
+            name="mybroker",
+            kind="portfolio",
+            sniff=lambda head: "MyBrokerISIN" in header_columns(head),
+            factory=lambda file_path, year: MyBrokerReader(file_path, year),
+            info=BrokerInfo(name="MYBROKER", country="DE", columns=["product", "isin", "amount", "eur_value"]),
+        )
+    )
+
+Process pool workers only know the readers registered through entry points or on import of their modules.
+"""
+
+import csv
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+
+if TYPE_CHECKING:
+    from modelo720.model.references import BrokerInfo
+
+# Bytes of a file read to detect its broker
+SNIFF_BYTES = 4096
+# Broker of a `FileConfig` detected from the file
+AUTO_BROKER = "auto"
+READERS_ENTRY_POINT = "modelo720.readers"
+ACTIVITY_HEADER = ["Statement", "Header"]
+
+
+@dataclass(frozen=True)
+class ReaderEntry:
+    """Reader of one kind of broker export."""
+
+    name: str
+    kind: Literal["portfolio", "activity"]
+    # Checks the first `SNIFF_BYTES` of a file, decoded as UTF-8
+    sniff: Callable[[str], bool]
+    # Builds the reader of a file from its path and year
+    factory: Callable[[Path, int], Any]
+    # Country and columns of the holdings of a portfolio reader
+    info: "BrokerInfo | None" = None
+    # Broker of the portfolio an activity statement belongs to
+    broker: str | None = None
+
+
+_readers: dict[str, ReaderEntry] = {}
+_lock = threading.RLock()
+_loaded = False
+
+
+def header_columns(head: str) -> list[str]:
+    """Parses the header line of the beginning of a CSV file.
+
+    Args:
+        head (str): beginning of the file
+
+    Returns:
+        list[str]: columns of the first line
+    """
+    return next(csv.reader(head.removeprefix("﻿").splitlines()[:1]), [])
+
+
+def read_head(file_path: str | Path, size: int = SNIFF_BYTES) -> str:
+    """Reads the beginning of a file.
+
+    Args:
+        file_path (Union[str, Path]): file path
+        size (int, optional): number of bytes to read. Defaults to `SNIFF_BYTES`.
+
+    Returns:
+        str: the bytes read, decoded as UTF-8 with undecodable bytes replaced.
+    """
+    with open(file_path, "rb") as f:
+        return f.read(size).decode("utf-8", errors="replace")
+
+
+def _degiro_reader(file_path: Path, year: int) -> Any:
+    from modelo720.degiro.reader import DegiroReader
+
+    return DegiroReader(file_path)
+
+
+def _ibkr_reader(file_path: Path, year: int) -> Any:
+    from modelo720.ibkr.reader import IbkrReader
+
+    return IbkrReader(file_path, year)
+
+
+def _ibkr_activity(file_path: Path, year: int) -> Any:
+    from modelo720.ibkr.reader import get_activity
+
+    return get_activity(file_path, year)
+
+
+def _columns_sniffer(columns: list[str]) -> Callable[[str], bool]:
+    """Builds a signature check matching the files whose header holds all the given columns."""
+    required = set(columns)
+    return lambda head: required <= set(header_columns(head))
+
+
+def _load_readers() -> None:
+    """Registers the built-in readers and those of the installed plugins, once per process.
+
+    Plugins register their readers while loading, so the registry is marked loaded first; if loading fails, the
+    partial registrations are rolled back and the next call loads the readers again.
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        registered = dict(_readers)
+        try:
+            _register_builtins()
+            for plugin in entry_points(group=READERS_ENTRY_POINT):
+                plugin.load()()
+        except BaseException:
+            _readers.clear()
+            _readers.update(registered)
+            _loaded = False
+            raise
+
+
+def _register_builtins() -> None:
+    """Registers the Degiro, IBKR and IBKR activity readers."""
+    from modelo720.degiro.references import COLUMNS_DICT as DEGIRO_COLUMNS
+    from modelo720.ibkr.references import COLUMNS_DICT as IBKR_COLUMNS
+    from modelo720.model.references import BROKER_MAP
+
+    builtins = [
+        ReaderEntry(
+            "ibkr_activity",
+            "activity",
+            lambda head: header_columns(head)[:2] == ACTIVITY_HEADER,
+            _ibkr_activity,
+            broker="ibkr",
+        ),
+        ReaderEntry("ibkr", "portfolio", _columns_sniffer(list(IBKR_COLUMNS)), _ibkr_reader, BROKER_MAP["ibkr"]),
+        ReaderEntry(
+            "degiro", "portfolio", _columns_sniffer(list(DEGIRO_COLUMNS)), _degiro_reader, BROKER_MAP["degiro"]
+        ),
+    ]
+    for entry in builtins:
+        _readers.setdefault(entry.name, entry)
+
+
+def register_reader(entry: ReaderEntry, replace: bool = False) -> ReaderEntry:
+    """Registers a reader.
+
+    Args:
+        entry (ReaderEntry): reader to register
+        replace (bool, optional): replaces a reader registered with the same name. Defaults to False.
+
+    Returns:
+        ReaderEntry: the registered reader.
+
+    Raises:
+        ValueError: If a reader with the same name is registered and `replace` is False, or a portfolio reader
+            has no broker info.
+    """
+    if entry.kind == "portfolio" and entry.info is None:
+        raise ValueError(f"Portfolio reader '{entry.name}' needs its broker info")
+    _load_readers()
+    with _lock:
+        if entry.name in _readers and not replace:
+            raise ValueError(f"Reader '{entry.name}' is already registered")
+        _readers[entry.name] = entry
+    return entry
+
+
+def get_reader(name: str) -> ReaderEntry:
+    """Returns a registered reader.
+
+    Args:
+        name (str): name of the reader, e.g. "degiro"
+
+    Returns:
+        ReaderEntry: the reader
+
+    Raises:
+        ValueError: If no reader has this name.
+    """
+    _load_readers()
+    entry = _readers.get(name)
+    if entry is None:
+        raise ValueError(f"Unsupported broker type: {name}")
+    return entry
+
+
+def readers(kind: Literal["portfolio", "activity"] | None = None) -> list[ReaderEntry]:
+    """Returns the registered readers, in the order their signatures are checked.
+
+    Args:
+        kind (Literal["portfolio", "activity"], optional): only returns the readers of this kind.
+            Defaults to all of them.
+
+    Returns:
+        list[ReaderEntry]: registered readers
+    """
+    _load_readers()
+    with _lock:
+        return [entry for entry in _readers.values() if kind is None or entry.kind == kind]
+
+
+def detect_reader(file_path: str | Path) -> ReaderEntry | None:
+    """Detects the reader of a file from its first `SNIFF_BYTES`.
+
+    Args:
+        file_path (Union[str, Path]): file path
+
+    Returns:
+        ReaderEntry | None: the first reader whose signature matches, or None when the file is not recognized.
+    """
+    head = read_head(file_path)
+    return next((entry for entry in readers() if entry.sniff(head)), None)
+
+
+def classify(directory: str | Path, pattern: str = "*.csv") -> dict[Path, ReaderEntry | None]:
+    """Detects the reader of every file of a directory.
+
+    Args:
+        directory (Union[str, Path]): directory of the broker exports
+        pattern (str, optional): glob pattern of the files. Defaults to "*.csv".
+
+    Returns:
+        dict[Path, ReaderEntry | None]: reader of each file, in file name order, None when not recognized.
+    """
+    return {file_path: detect_reader(file_path) for file_path in sorted(Path(directory).glob(pattern))}
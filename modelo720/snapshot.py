@@ -0,0 +1,140 @@
+"""Offline ECB rate snapshots for modelo720.
+
+A snapshot is an uncompressed Arrow IPC file with one row per (currency, date) fixing, sorted by
+currency and date, so it can be memory-mapped and sliced without parsing. A JSON manifest next to it
+records the snapshot version, which is derived from the ECB source file contents.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import zipfile
+from datetime import date
+from functools import cached_property
+from pathlib import Path
+
+import polars as pl
+
+SNAPSHOT_ENV_VAR = "MODELO720_FX_SNAPSHOT"
+SNAPSHOT_SCHEMA = {"fx_currency": pl.Utf8, "fx_date": pl.Date, "fx_rate": pl.Float64}
+
+
+class RateSnapshot:
+    """Memory-mapped ECB rate snapshot."""
+
+    def __init__(self, path: str | Path):
+        """Initializes the snapshot. Nothing is read until the rates or the manifest are accessed.
+
+        Args:
+            path (Union[str, Path]): file path of the Arrow IPC snapshot
+        """
+        self.path = Path(path)
+
+    @property
+    def manifest_path(self) -> Path:
+        """Returns the path of the JSON manifest of the snapshot."""
+        return self.path.with_suffix(".json")
+
+    @cached_property
+    def manifest(self) -> dict:
+        """Returns the manifest of the snapshot."""
+        return json.loads(self.manifest_path.read_text())
+
+    @property
+    def version(self) -> str:
+        """Returns the version of the snapshot."""
+        return self.manifest["version"]
+
+    @cached_property
+    def frame(self) -> pl.DataFrame:
+        """Returns the fixings, memory-mapped from the snapshot file."""
+        return pl.read_ipc(self.path, memory_map=True, rechunk=False)
+
+    @property
+    def currencies(self) -> set[str]:
+        """Returns the currencies with fixings in the snapshot."""
+        return set(self.manifest["currencies"])
+
+    def history(self, currency: str) -> pl.DataFrame:
+        """Returns the fixings of a currency.
+
+        Args:
+            currency (str): The currency code (e.g., 'USD', 'GBP').
+
+        Returns:
+            pl.DataFrame: frame with `fx_date` and `fx_rate` columns sorted by date.
+        """
+        return self.frame.filter(pl.col("fx_currency") == currency).select(["fx_date", "fx_rate"])
+
+
+def read_ecb_file(source: str | Path) -> tuple[pl.DataFrame, bytes]:
+    """Reads an ECB historical rates file (`eurofxref-hist.csv` or its zip) into long format.
+
+    Args:
+        source (Union[str, Path]): file path of the ECB file
+
+    Returns:
+        tuple[pl.DataFrame, bytes]: fixings sorted by currency and date, and the raw file contents.
+    """
+    content = Path(source).read_bytes()
+    csv_bytes = content
+    if zipfile.is_zipfile(io.BytesIO(content)):
+        with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+            csv_bytes = zip_file.read(zip_file.namelist()[0])
+
+    wide = pl.read_csv(io.BytesIO(csv_bytes), null_values=["N/A", ""], infer_schema=False)
+    # The ECB file ends every line with a trailing comma, which shows up as an unnamed empty column
+    wide = wide.select([col for col in wide.columns if col.strip() and not col.startswith("_duplicated_")])
+    fixings = (
+        wide.unpivot(index="Date", variable_name="fx_currency", value_name="fx_rate")
+        .drop_nulls("fx_rate")
+        .select(
+            pl.col("fx_currency").str.strip_chars(),
+            pl.col("Date").str.to_date("%Y-%m-%d").alias("fx_date"),
+            pl.col("fx_rate").str.strip_chars().cast(pl.Float64),
+        )
+        .sort(["fx_currency", "fx_date"])
+    )
+    return fixings, content
+
+
+def build_rate_snapshot(source: str | Path, output: str | Path) -> RateSnapshot:
+    """Builds a rate snapshot from a local ECB historical rates file.
+
+    Args:
+        source (Union[str, Path]): file path of the ECB file (`eurofxref-hist.zip` or `.csv`)
+        output (Union[str, Path]): file path of the snapshot to write
+
+    Returns:
+        RateSnapshot: the written snapshot.
+    """
+    fixings, content = read_ecb_file(source)
+    last_date: date = fixings["fx_date"].max()
+    snapshot = RateSnapshot(output)
+    snapshot.path.parent.mkdir(parents=True, exist_ok=True)
+    fixings.write_ipc(snapshot.path, compression="uncompressed")
+    manifest = {
+        "version": f"ecb-{last_date.isoformat()}-{hashlib.sha256(content).hexdigest()[:12]}",
+        "source": Path(source).name,
+        "first_date": fixings["fx_date"].min().isoformat(),
+        "last_date": last_date.isoformat(),
+        "currencies": sorted(fixings["fx_currency"].unique().to_list()),
+        "rows": fixings.height,
+    }
+    snapshot.manifest_path.write_text(json.dumps(manifest, indent=2))
+    return snapshot
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Rebuilds a rate snapshot from the command line."""
+    parser = argparse.ArgumentParser(description="Build an offline ECB rate snapshot for modelo720.")
+    parser.add_argument("source", help="ECB historical rates file (eurofxref-hist.zip or .csv)")
+    parser.add_argument("output", help="snapshot file to write (Arrow IPC)")
+    args = parser.parse_args(argv)
+    snapshot = build_rate_snapshot(args.source, args.output)
+    print(f"Wrote {snapshot.path} ({snapshot.version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""TARGET2 trading-day calendar of the ECB reference rates.
+
+The ECB publishes its euro foreign exchange reference rates on every TARGET business day: weekdays other than
+New Year's Day, Good Friday, Easter Monday, Labour Day and Christmas and Boxing Day. Scalar lookups are memoized
+per year, and the `*_expr` functions resolve whole columns of dates with Polars against a precomputed holiday
+table:
+
+    df.with_columns(previous_fixing_day_expr("trade_date").alias("fx_date"))
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+import polars as pl
+
+# Years covered by the holiday table of the vectorized lookups, from the introduction of the euro
+FIRST_YEAR = 1999
+LAST_YEAR = 2099
+
+
+def easter_sunday(year: int) -> date:
+    """Returns the Easter Sunday of a year, with the anonymous Gregorian algorithm.
+
+    Args:
+        year (int): year
+
+    Returns:
+        date: Easter Sunday
+    """
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    r = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * r) // 433
+    month = (h + r - 7 * m + 90) // 25
+    day = (h + r - 7 * m + 33 * month + 19) % 32
+    return date(year, month, day)
+
+
+@lru_cache(maxsize=256)
+def target_holidays(year: int) -> frozenset[date]:
+    """Returns the TARGET holidays of a year, on which the ECB publishes no reference rates.
+
+    Args:
+        year (int): year
+
+    Returns:
+        frozenset[date]: holidays of the year, including those falling on a weekend.
+    """
+    holidays = {date(year, 1, 1), date(year, 12, 25)}
+    if year >= 2000:
+        easter = easter_sunday(year)
+        holidays |= {easter - timedelta(days=2), easter + timedelta(days=1), date(year, 5, 1), date(year, 12, 26)}
+    if year in (1998, 1999, 2001):
+        holidays.add(date(year, 12, 31))
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=1)
+def holiday_table() -> list[date]:
+    """Returns the sorted TARGET holidays of the years between `FIRST_YEAR` and `LAST_YEAR`.
+
+    Returns:
+        list[date]: holidays
+    """
+    return sorted(day for year in range(FIRST_YEAR, LAST_YEAR + 1) for day in target_holidays(year))
+
+
+def is_fixing_day(day: date) -> bool:
+    """Checks whether the ECB publishes reference rates on a day.
+
+    Args:
+        day (date): day
+
+    Returns:
+        bool: True on TARGET business days.
+    """
+    return day.weekday() < 5 and day not in target_holidays(day.year)
+
+
+@lru_cache(maxsize=4096)
+def previous_fixing_day(day: date) -> date:
+    """Returns the last ECB fixing day on or before a day.
+
+    Args:
+        day (date): day
+
+    Returns:
+        date: the day itself when it is a fixing day, otherwise the closest previous one.
+    """
+    while not is_fixing_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=256)
+def last_trading_day_of_year(year: int) -> date:
+    """Returns the last ECB fixing day of a year.
+
+    Args:
+        year (int): year
+
+    Returns:
+        date: last trading day of the year
+    """
+    return previous_fixing_day(date(year, 12, 31))
+
+
+def previous_fixing_day_expr(day: str | pl.Expr) -> pl.Expr:
+    """Vectorized `previous_fixing_day` of a column of dates.
+
+    Only the holidays between `FIRST_YEAR` and `LAST_YEAR` are known; other years only skip weekends.
+
+    Args:
+        day (str | pl.Expr): column (or expression) of dates
+
+    Returns:
+        pl.Expr: Date expression
+    """
+    day = pl.col(day) if isinstance(day, str) else day
+    return day.cast(pl.Date).dt.add_business_days(0, holidays=holiday_table(), roll="backward")
+
+
+def last_trading_day_expr(year: str | pl.Expr) -> pl.Expr:
+    """Vectorized `last_trading_day_of_year` of a column of years.
+
+    Args:
+        year (str | pl.Expr): column (or expression) of years
+
+    Returns:
+        pl.Expr: Date expression
+    """
+    year = pl.col(year) if isinstance(year, str) else year
+    return previous_fixing_day_expr(pl.date(year, 12, 31))
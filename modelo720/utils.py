@@ -1,41 +1,419 @@
 """utils module."""
 
+import os
+import threading
+from collections import OrderedDict
+from datetime import date as dt_date
 from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-from currency_converter import CurrencyConverter
+import polars as pl
 
+from modelo720 import trading_calendar
+from modelo720.instrumentation import span
 
-def convert_to_eur_historical(amount: float, currency: str, date: str) -> float | None:
+# currency_converter is only imported when first used, to keep imports fast
+if TYPE_CHECKING:
+    from currency_converter import CurrencyConverter
+
+REF_CURRENCY = "EUR"
+
+# Longest gap between two ECB fixings (e.g. Easter or Christmas closures) bridged by the as-of join
+FX_ASOF_TOLERANCE = "7d"
+
+
+class FxEngine:
+    """Process-wide engine to convert amounts to EUR using ECB historical rates.
+
+    The ECB history is loaded once, on first use, and every (currency, date) lookup is
+    memoized in a bounded LRU index so repeated conversions do not touch the converter.
+    """
+
+    def __init__(self, maxsize: int = 4096, snapshot: str | Path | None = None):
+        """Initializes the engine.
+
+        Args:
+            maxsize (int, optional): maximum number of (currency, date) rates kept in the index.
+                Defaults to 4096.
+            snapshot (Union[str, Path], optional): offline rate snapshot built with
+                `modelo720.snapshot`. Defaults to the ECB history bundled with `currency_converter`.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.history_hits = 0
+        self.history_misses = 0
+        self.snapshot = None
+        if snapshot is not None:
+            from modelo720.snapshot import RateSnapshot
+
+            self.snapshot = RateSnapshot(snapshot)
+        self._converter: CurrencyConverter | None = None
+        self._index: OrderedDict[tuple[str, dt_date | None], float] = OrderedDict()
+        self._history: dict[str, pl.DataFrame] = {}
+        self._bundled: pl.DataFrame | None = None
+        self._fixings: dict[str, dict[dt_date, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def converter(self) -> "CurrencyConverter":
+        """Returns the underlying converter, loading the ECB history on first access."""
+        if self._converter is None:
+            from currency_converter import CurrencyConverter
+
+            with self._lock:
+                if self._converter is None:
+                    self._converter = CurrencyConverter()
+        return self._converter
+
+    @property
+    def currencies(self) -> set[str]:
+        """Returns the supported currencies."""
+        if self.snapshot is not None:
+            return self.snapshot.currencies | {REF_CURRENCY}
+        return self.converter.currencies
+
+    @property
+    def version(self) -> str:
+        """Returns the version of the rates in use, to be recorded with the generated declarations."""
+        if self.snapshot is not None:
+            return self.snapshot.version
+        from currency_converter import __version__ as currency_converter_version
+
+        return f"currencyconverter-{currency_converter_version}"
+
+    @staticmethod
+    def _as_date(date: str | dt_date | datetime | None) -> dt_date | None:
+        """Normalizes the supported date inputs to a `datetime.date`."""
+        if date is None or type(date) is dt_date:
+            return date
+        if isinstance(date, str):
+            return dt_date.fromisoformat(date[:10])
+        return date.date()
+
+    def rate(self, currency: str, date: str | dt_date | datetime | None = None) -> float:
+        """Returns the ECB reference rate of a currency, expressed as units of currency per EUR.
+
+        Args:
+            currency (str): The currency code (e.g., 'USD', 'GBP').
+            date (str | date | datetime | None, optional): Date of the rate. Defaults to the last available one.
+
+        Returns:
+            float: units of `currency` per EUR.
+
+        Raises:
+            ValueError: If the currency is not supported.
+            RateNotFoundError: If there is no rate for the given date.
+        """
+        # Dates without fixing (weekends, TARGET holidays) share the rate of the previous fixing day
+        date = self._as_date(date)
+        key = (currency, trading_calendar.previous_fixing_day(date) if date is not None else None)
+        with self._lock:
+            rate = self._index.get(key)
+            if rate is not None:
+                self._index.move_to_end(key)
+                self.hits += 1
+                return rate
+            self.misses += 1
+
+        if self.snapshot is None:
+            rate = self.converter.convert(1, REF_CURRENCY, currency, key[1])
+        else:
+            rate = self._snapshot_rate(currency, key[1])
+
+        with self._lock:
+            self._index[key] = rate
+            if len(self._index) > self.maxsize:
+                self._index.popitem(last=False)
+        return rate
+
+    def _snapshot_rate(self, currency: str, date: dt_date | None) -> float:
+        """Looks up a rate in the offline snapshot with the same rules as `CurrencyConverter`."""
+        if currency == REF_CURRENCY:
+            return 1.0
+        fixings = self._fixings.get(currency)
+        if fixings is None:
+            history = self.history(currency)
+            fixings = self._fixings[currency] = dict(zip(history["fx_date"], history["fx_rate"], strict=True))
+        if date is None:
+            date = max(fixings)
+        if date not in fixings:
+            from currency_converter import RateNotFoundError
+
+            raise RateNotFoundError(f"{currency} has no rate for {date}")
+        return fixings[date]
+
+    def convert(self, amount: float, currency: str, date: str | dt_date | datetime | None = None) -> float:
+        """Converts an amount from a given currency to EUR.
+
+        Args:
+            amount (float): The amount of money in the original currency.
+            currency (str): The currency code of the original amount.
+            date (str | date | datetime | None, optional): Date of the rate. Defaults to the last available one.
+
+        Returns:
+            float: The equivalent amount in EUR.
+        """
+        return float(amount) / self.rate(currency, date)
+
+    def history(self, currency: str) -> pl.DataFrame:
+        """Returns the published fixings of a currency.
+
+        Args:
+            currency (str): The currency code (e.g., 'USD', 'GBP').
+
+        Returns:
+            pl.DataFrame: frame with `fx_date` and `fx_rate` columns sorted by date.
+
+        Raises:
+            ValueError: If the currency is not supported.
+        """
+        frame = self._history.get(currency)
+        if frame is not None:
+            self.history_hits += 1
+        else:
+            self.history_misses += 1
+            if currency not in self.currencies:
+                raise ValueError(f"{currency} is not a supported currency")
+            if self.snapshot is not None:
+                frame = self.snapshot.history(currency)
+            else:
+                frame = (
+                    self._bundled_fixings()
+                    .filter(pl.col("fx_currency") == currency)
+                    .select(["fx_date", "fx_rate"])
+                    .sort("fx_date")
+                )
+            self._history[currency] = frame
+        return frame
+
+    def _bundled_fixings(self) -> pl.DataFrame:
+        """Returns the fixings of the ECB history bundled with `currency_converter`, read once."""
+        if self._bundled is None:
+            from currency_converter import CURRENCY_FILE
+
+            from modelo720.snapshot import read_ecb_file
+
+            with self._lock:
+                if self._bundled is None:
+                    self._bundled = read_ecb_file(CURRENCY_FILE)[0]
+        return self._bundled
+
+    def rate_table(self, pairs: pl.DataFrame) -> pl.DataFrame:
+        """Resolves the EUR rate of each (currency, date) pair in a single as-of join.
+
+        Dates without fixing (weekends, holidays) take the closest previous fixing.
+
+        Args:
+            pairs (pl.DataFrame): frame with `fx_currency` (str) and `fx_date` (date) columns.
+
+        Returns:
+            pl.DataFrame: the distinct pairs with their `fx_rate` (units of currency per EUR).
+
+        Raises:
+            ValueError: If a currency is not supported.
+            RateNotFoundError: If a pair has no fixing within the as-of tolerance.
+        """
+        pairs = pairs.select(["fx_currency", "fx_date"]).drop_nulls().unique().sort("fx_date")
+        currencies = [c for c in pairs["fx_currency"].unique().to_list() if c != REF_CURRENCY]
+        histories = [self.history(c).with_columns(pl.lit(c).alias("fx_currency")) for c in currencies]
+        fixings = (
+            pl.concat(histories).sort("fx_date")
+            if histories
+            else pl.DataFrame(schema={"fx_date": pl.Date, "fx_rate": pl.Float64, "fx_currency": pl.Utf8})
+        )
+
+        rates = pairs.join_asof(
+            fixings, on="fx_date", by="fx_currency", strategy="backward", tolerance=FX_ASOF_TOLERANCE
+        ).with_columns(
+            pl.when(pl.col("fx_currency") == REF_CURRENCY).then(1.0).otherwise(pl.col("fx_rate")).alias("fx_rate")
+        )
+
+        missing = rates.filter(pl.col("fx_rate").is_null())
+        if not missing.is_empty():
+            from currency_converter import RateNotFoundError
+
+            first = missing.row(0, named=True)
+            raise RateNotFoundError(f"{first['fx_currency']} has no rate for {first['fx_date']}")
+        return rates
+
+    def to_eur(
+        self,
+        df: pl.DataFrame,
+        amount: str | pl.Expr,
+        currency: str | pl.Expr,
+        date: str | pl.Expr,
+        alias: str = "eur_value",
+    ) -> pl.DataFrame:
+        """Converts a column of amounts to EUR with a join against the distinct (currency, date) rates.
+
+        Args:
+            df (pl.DataFrame): polars dataframe
+            amount (str | pl.Expr): column (or expression) with the amounts in the original currency.
+            currency (str | pl.Expr): column (or expression) with the currency codes.
+            date (str | pl.Expr): column (or expression) with the conversion dates.
+            alias (str, optional): name of the converted column. Defaults to "eur_value".
+
+        Returns:
+            pl.DataFrame: dataframe with the converted column.
+        """
+        amount, currency, date = (pl.col(e) if isinstance(e, str) else e for e in (amount, currency, date))
+        with span("fx.to_eur", column=alias) as fx_span:
+            fx_span.rows = len(df)
+            df = df.with_columns(currency.alias("fx_currency"), date.cast(pl.Date).alias("fx_date"))
+            # Resolving the fixing day of every date first leaves fewer distinct pairs for the as-of join
+            df = df.with_columns(trading_calendar.previous_fixing_day_expr("fx_date"))
+            rates = self.rate_table(df)
+            return (
+                df.join(rates, on=["fx_currency", "fx_date"], how="left", maintain_order="left")
+                .with_columns((amount.cast(pl.Float64) / pl.col("fx_rate")).alias(alias))
+                .drop(["fx_currency", "fx_date", "fx_rate"])
+            )
+
+    def to_eur_expr(self, amount: str | pl.Expr, currency: str | pl.Expr, date: str | pl.Expr) -> pl.Expr:
+        """Lazy counterpart of `to_eur`: converts each batch with a join against its distinct rates.
+
+        Args:
+            amount (str | pl.Expr): column (or expression) with the amounts in the original currency.
+            currency (str | pl.Expr): column (or expression) with the currency codes.
+            date (str | pl.Expr): column (or expression) with the conversion dates.
+
+        Returns:
+            pl.Expr: expression with the amounts in EUR.
+        """
+        amount, currency, date = (pl.col(e) if isinstance(e, str) else e for e in (amount, currency, date))
+
+        def convert(batch: pl.Series) -> pl.Series:
+            return self.to_eur(batch.struct.unnest(), "amount", "currency", "date", alias="eur")["eur"]
+
+        return pl.struct(amount.alias("amount"), currency.alias("currency"), date.alias("date")).map_batches(
+            convert, return_dtype=pl.Float64, is_elementwise=True
+        )
+
+    def stats(self) -> dict[str, float]:
+        """Returns the hit/miss counters of the rate index and of the per-currency histories.
+
+        Returns:
+            dict[str, float]: hits, misses, hit ratio and current size of the index, and history hits and misses.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._index),
+            "maxsize": self.maxsize,
+            "history_hits": self.history_hits,
+            "history_misses": self.history_misses,
+        }
+
+    def clear(self) -> None:
+        """Empties the rate index and resets the counters."""
+        with self._lock:
+            self._index.clear()
+            self._history.clear()
+            self._fixings.clear()
+            self.hits = 0
+            self.misses = 0
+            self.history_hits = 0
+            self.history_misses = 0
+
+
+_FX_ENGINE: FxEngine | None = None
+_FX_ENGINE_LOCK = threading.Lock()
+
+
+def get_fx_engine() -> FxEngine:
+    """Returns the process-wide FX engine, creating it on first use.
+
+    The engine reads the offline snapshot pointed to by the `MODELO720_FX_SNAPSHOT` environment
+    variable when it is set.
+
+    Returns:
+        FxEngine: shared FX engine.
+    """
+    from modelo720.snapshot import SNAPSHOT_ENV_VAR
+
+    global _FX_ENGINE
+    if _FX_ENGINE is None:
+        with _FX_ENGINE_LOCK:
+            if _FX_ENGINE is None:
+                _FX_ENGINE = FxEngine(snapshot=os.environ.get(SNAPSHOT_ENV_VAR) or None)
+    return _FX_ENGINE
+
+
+def configure_fx_engine(snapshot: str | Path | None = None, maxsize: int = 4096) -> FxEngine:
+    """Replaces the process-wide FX engine.
+
+    Args:
+        snapshot (Union[str, Path], optional): offline rate snapshot. Defaults to the bundled ECB history.
+        maxsize (int, optional): maximum number of rates kept in the index. Defaults to 4096.
+
+    Returns:
+        FxEngine: the new shared FX engine.
+    """
+    global _FX_ENGINE
+    with _FX_ENGINE_LOCK:
+        _FX_ENGINE = FxEngine(maxsize=maxsize, snapshot=snapshot)
+    return _FX_ENGINE
+
+
+def convert_to_eur_historical(amount: float, currency: str, date: str, strict: bool = False) -> float | None:
     """Converts an amount from a given currency to EUR using historical exchange rates.
 
+    Dates without ECB fixing (weekends and TARGET holidays) take the rate of the previous fixing day, whereas
+    `CurrencyConverter` raises for them; `strict` keeps that behaviour.
+
     Args:
         amount (float): The amount of money in the original currency.
         currency (str): The currency code (e.g., 'USD', 'GBP') of the original amount.
         date (str): The date in 'YYYY-MM-DD' format for which to fetch the exchange rate.
+        strict (bool, optional): raises for dates without fixing instead of taking the rate of the previous
+            fixing day. Defaults to False.
 
     Returns:
         float: The equivalent amount in EUR.
 
     Raises:
         ValueError: If the currency is not supported or the date format is incorrect.
+        RateNotFoundError: If there is no rate for the date, or, with `strict`, if the date has no fixing.
     """
-    # Initialize the currency converter
-    curr_conv = CurrencyConverter()
-    return curr_conv.convert(amount, currency, "EUR", date)
+    if strict and not trading_calendar.is_fixing_day(FxEngine._as_date(date)):
+        from currency_converter import RateNotFoundError
+
+        raise RateNotFoundError(f"{date} is not an ECB fixing day")
+    return get_fx_engine().convert(amount, currency, date)
 
 
-def last_trading_day_of_year(year: int) -> datetime:
+def last_trading_day_of_year(year: int) -> dt_date:
     """Returns the last trading day of a given year.
 
     Args:
         year (int): The year for which to find the last trading day.
 
     Returns:
-        datetime: The last trading day of the year.
+        date: The last ECB fixing day of the year, skipping weekends and TARGET holidays.
+    """
+    return trading_calendar.last_trading_day_of_year(year)
+
+
+def parse_number(expr: pl.Expr, decimal: str = ",", thousands: str = ".") -> pl.Expr:
+    """Parses a string column of localized numbers into floats with native Polars expressions.
+
+    The thousands separators are dropped before the decimal separator is replaced, whether the value has
+    decimals or not ("1.234,56" -> 1234.56, "1.234" -> 1234.0, "10" -> 10.0).
+
+    Args:
+        expr (pl.Expr): string expression
+        decimal (str, optional): decimal separator. Defaults to ",".
+        thousands (str, optional): thousands separator. Defaults to ".".
+
+    Returns:
+        pl.Expr: Float64 expression
     """
-    date_range = pd.date_range(start=f"{year}-01-01", end=f"{year}-12-31", freq="B")
-    return date_range[-1]
+    text = expr.str.strip_chars().str.replace_all(thousands, "", literal=True)
+    return text.str.replace(decimal, ".", literal=True).cast(pl.Float64)
 
 
 def try_float(s: str) -> bool:
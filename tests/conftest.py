@@ -0,0 +1,58 @@
+"""shared fixtures of the tests, built on the synthetic exports of `benchmarks.generate`."""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.generate import generate_dataset
+
+YEAR = 2024
+ROWS = 300
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Isolates the tests from the environment of the user, before modelo720 is imported by the test modules.
+
+    Logs go to a temporary directory, and no parse cache, FX snapshot nor instruments file is read.
+    """
+    os.environ["MODELO720_LOG_DIR"] = tempfile.mkdtemp(prefix="modelo720-logs-")
+    for name in ("MODELO720_CACHE_DIR", "MODELO720_NO_CACHE", "MODELO720_FX_SNAPSHOT", "MODELO720_INSTRUMENTS"):
+        os.environ.pop(name, None)
+
+
+@pytest.fixture(scope="session")
+def dataset(tmp_path_factory: pytest.TempPathFactory) -> dict[str, Path]:
+    """Writes the exports of two consecutive years once for the whole session."""
+    return generate_dataset(tmp_path_factory.mktemp("dataset"), ROWS, year=YEAR)
+
+
+@pytest.fixture(scope="session")
+def configs(dataset: dict[str, Path]) -> list:
+    """Configurations of the exports of the current year, with the IBKR activity statement."""
+    from modelo720.model import FileConfig
+
+    return [
+        FileConfig(dataset["degiro"], "degiro", True, YEAR),
+        FileConfig(dataset["ibkr"], "ibkr", True, YEAR, activity_file=dataset["activity"]),
+    ]
+
+
+@pytest.fixture(scope="session")
+def prev_configs(dataset: dict[str, Path]) -> list:
+    """Configurations of the exports of the previous year."""
+    from modelo720.model import FileConfig
+
+    return [
+        FileConfig(dataset["degiro_prev"], "degiro", True, YEAR - 1),
+        FileConfig(dataset["ibkr_prev"], "ibkr", True, YEAR - 1),
+    ]
+
+
+@pytest.fixture(scope="session")
+def compute(configs: list, prev_configs: list):
+    """Eager computation of the declaration of the current year."""
+    from modelo720.model import GlobalCompute
+
+    return GlobalCompute(configs, prev_configs)
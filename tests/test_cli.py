@@ -0,0 +1,46 @@
+import pytest
+
+from modelo720.cli import discover_configs, main
+from modelo720.model.references import GLOBAL_INFO
+
+from .conftest import YEAR
+
+
+@pytest.fixture
+def declarant(tmp_path):
+    file_path = tmp_path / "declarant.json"
+    file_path.write_text(GLOBAL_INFO.model_dump_json())
+    return file_path
+
+
+def test_discover_configs(dataset):
+    configs = discover_configs(dataset["degiro"].parent)
+    assert sorted(configs) == [YEAR - 1, YEAR]
+    current = {config.broker: config for config in configs[YEAR]}
+    assert sorted(current) == ["degiro", "ibkr"]
+    assert current["ibkr"].activity_file == dataset["activity"]
+    assert all(config.activity_file is None for config in configs[YEAR - 1])
+
+
+def test_discover_configs_skips_unmatched_activity(dataset, tmp_path, caplog):
+    (tmp_path / f"Activity{YEAR}_IBKR.csv").write_bytes(dataset["activity"].read_bytes())
+    (tmp_path / f"Portfolio{YEAR}.csv").write_bytes(dataset["degiro"].read_bytes())
+    with caplog.at_level("INFO", logger="modelo720"):
+        configs = discover_configs(tmp_path)
+    assert [config.broker for config in configs[YEAR]] == ["degiro"]
+    assert f"Skipped {tmp_path / f'Activity{YEAR}_IBKR.csv'}: no ibkr portfolio export of {YEAR}" in caplog.messages
+
+
+def test_build_directory(dataset, declarant, tmp_path, capsys):
+    output_dir = tmp_path / "out"
+    assert main(["build", str(dataset["degiro"].parent), "-o", str(output_dir), "-d", str(declarant)]) == 0
+    assert (output_dir / f"modelo720_{YEAR}.720").stat().st_size > 0
+    assert (output_dir / f"modelo720_{YEAR}.meta.json").exists()
+    assert (output_dir / f"modelo720_{YEAR}_proceeds.csv").exists()
+    assert "declaration" in capsys.readouterr().out
+    assert main(["validate", str(output_dir / f"modelo720_{YEAR}.720")]) == 0
+
+
+def test_build_directory_requires_declarant(dataset, tmp_path, capsys):
+    assert main(["build", str(dataset["degiro"].parent), "-o", str(tmp_path)]) == 2
+    assert "--declarant" in capsys.readouterr().err
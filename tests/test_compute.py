@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from modelo720.model import GlobalCompute
+from modelo720.model.references import HEADER_LAYOUT, RECORD_LENGTH, TRANSACTION_LAYOUT
+
+MODES = {
+    "lazy": {"lazy": True},
+    "streaming": {"lazy": True, "streaming": True},
+    "threads": {"jobs": 2},
+    "processes": {"jobs": 2, "executor": "process"},
+}
+
+
+def _declaration(compute: GlobalCompute, with_previous: bool) -> bytes:
+    buffer = io.BytesIO()
+    compute.write_financial_record(buffer, with_previous=with_previous)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("with_previous", [False, True])
+@pytest.mark.parametrize("mode", list(MODES))
+def test_modes_write_identical_declarations(compute, configs, prev_configs, mode, with_previous):
+    other = GlobalCompute(configs, prev_configs, **MODES[mode])
+    assert _declaration(other, with_previous) == _declaration(compute, with_previous)
+
+
+@pytest.mark.parametrize("with_previous", [False, True])
+def test_declaration_is_valid(compute, with_previous):
+    lines = _declaration(compute, with_previous).split(b"\r\n")
+    assert lines.pop() == b""
+    assert all(len(line) == RECORD_LENGTH for line in lines)
+    assert compute.validate(with_previous).is_empty()
+
+
+@pytest.mark.parametrize("with_previous", [False, True])
+def test_header_total_is_the_sum_of_the_records(compute, with_previous):
+    records = compute.records(with_previous).to_list()
+    start, length, _ = TRANSACTION_LAYOUT["valuation_1"]
+    header_start, header_length, _ = HEADER_LAYOUT["valuation_1"]
+    total = int(records[0][header_start - 1 : header_start - 1 + header_length])
+    summed = sum(int(record[start - 1 : start - 1 + length]) for record in records[1:])
+    # Every record truncates its valuation to cents
+    assert 0 <= total - summed < len(records)
+
+
+def test_batches_do_not_change_the_declaration(compute):
+    buffer = io.BytesIO()
+    compute.write_financial_record(buffer, with_previous=True, batch_size=7)
+    assert buffer.getvalue() == _declaration(compute, True)
+
+
+@pytest.mark.parametrize("option", ["A", "M", "C"])
+def test_columnar_records_match_row_records(compute, option):
+    df = GlobalCompute.with_default_keys(compute.data)
+    expected = [part for row in df.iter_rows(named=True) for part in GlobalCompute.get_transaction_record(row, option)]
+    assert GlobalCompute.render_transaction_records(df, option) == expected
+
+
+def test_write_metadata_next_to_the_declaration(compute, tmp_path):
+    dest = tmp_path / "modelo720.720"
+    written = compute.write_financial_record(dest)
+    metadata = (tmp_path / "modelo720.meta.json").read_text()
+    assert f'"records": {written}' in metadata
+    assert f'"fx_version": "{compute.fx_version}"' in metadata
+
+
+def test_activity_files_are_parsed_for_closed_holdings(compute, configs):
+    assert "activity_instruments" not in vars(GlobalCompute(configs))
+    assert (compute.data_difference["order_type"] == "C").any()
+    assert "activity_instruments" in vars(compute)
@@ -0,0 +1,28 @@
+import polars as pl
+import pytest
+
+from modelo720.degiro.reader import DegiroReader
+from modelo720.utils import parse_number
+
+
+@pytest.mark.parametrize(
+    ("text", "value"),
+    [
+        ("1.234,56", 1234.56),
+        ("1.234", 1234.0),
+        ("1.234.567", 1234567.0),
+        ("10", 10.0),
+        (" 0,5 ", 0.5),
+        ("-2.410,10", -2410.1),
+        (None, None),
+    ],
+)
+def test_parse_number(text, value):
+    df = pl.DataFrame({"text": [text]}, schema={"text": pl.Utf8})
+    assert df.select(parse_number(pl.col("text"))).item() == value
+
+
+def test_data_matches_scan(dataset):
+    reader = DegiroReader(dataset["degiro"], use_cache=False)
+    assert reader.data.equals(reader.scan().collect())
+    assert reader.data["local_curr"].null_count() == 0
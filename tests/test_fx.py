@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import polars as pl
+import pytest
+from currency_converter import CURRENCY_FILE, CurrencyConverter, RateNotFoundError
+
+from modelo720 import trading_calendar
+from modelo720.snapshot import build_rate_snapshot
+from modelo720.utils import FxEngine, convert_to_eur_historical
+
+CURRENCIES = ["USD", "GBP", "CHF", "JPY", "EUR"]
+FIXING_DAYS = [
+    day
+    for day in (date(2023, 12, 1) + timedelta(days=offset) for offset in range(60))
+    if trading_calendar.is_fixing_day(day)
+]
+
+
+@pytest.fixture(scope="module")
+def converter() -> CurrencyConverter:
+    return CurrencyConverter()
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory: pytest.TempPathFactory):
+    return build_rate_snapshot(CURRENCY_FILE, tmp_path_factory.mktemp("fx") / "rates.arrow").path
+
+
+@pytest.mark.parametrize("offline", [False, True])
+@pytest.mark.parametrize("currency", CURRENCIES)
+def test_rate_matches_converter(converter, snapshot, currency, offline):
+    engine = FxEngine(snapshot=snapshot if offline else None)
+    for day in FIXING_DAYS:
+        assert engine.rate(currency, day) == converter.convert(1, "EUR", currency, day)
+        assert engine.convert(123.45, currency, day) == pytest.approx(converter.convert(123.45, currency, "EUR", day))
+
+
+def test_rate_of_non_fixing_days_is_the_previous_fixing():
+    engine = FxEngine()
+    # Saturday, and Christmas Day: both take the last fixing before them
+    assert engine.rate("USD", date(2023, 12, 23)) == engine.rate("USD", date(2023, 12, 22))
+    assert engine.rate("USD", date(2023, 12, 25)) == engine.rate("USD", date(2023, 12, 22))
+
+
+def test_to_eur_matches_converter(converter):
+    df = pl.DataFrame(
+        {
+            "amount": [float(100 + i) for i in range(len(FIXING_DAYS) * len(CURRENCIES))],
+            "currency": [currency for _ in FIXING_DAYS for currency in CURRENCIES],
+            "date": [day for day in FIXING_DAYS for _ in CURRENCIES],
+        }
+    )
+    converted = FxEngine().to_eur(df, "amount", "currency", "date")
+    expected = [
+        converter.convert(row["amount"], row["currency"], "EUR", row["date"]) for row in df.iter_rows(named=True)
+    ]
+    assert converted.columns == [*df.columns, "eur_value"]
+    assert converted["eur_value"].to_list() == pytest.approx(expected, rel=1e-12)
+
+
+def test_to_eur_without_rate():
+    df = pl.DataFrame({"amount": [1.0], "currency": ["USD"], "date": [date(1990, 1, 2)]})
+    with pytest.raises(RateNotFoundError):
+        FxEngine().to_eur(df, "amount", "currency", "date")
+
+
+def test_unsupported_currency():
+    with pytest.raises(ValueError, match="not a supported currency"):
+        FxEngine().history("XXX")
+
+
+def test_convert_to_eur_historical_strict(converter):
+    assert convert_to_eur_historical(100, "USD", "2023-12-22", strict=True) == pytest.approx(
+        converter.convert(100, "USD", "EUR", date(2023, 12, 22))
+    )
+    assert convert_to_eur_historical(100, "USD", "2023-12-25") == convert_to_eur_historical(100, "USD", "2023-12-22")
+    for day in ("2023-12-23", "2023-12-25"):
+        with pytest.raises(RateNotFoundError):
+            convert_to_eur_historical(100, "USD", day, strict=True)
+        with pytest.raises(RateNotFoundError):
+            converter.convert(100, "USD", "EUR", date.fromisoformat(day))
@@ -0,0 +1,18 @@
+from polars.testing import assert_frame_equal
+
+from modelo720.ibkr.reader import IbkrActivity
+
+from .conftest import YEAR
+
+
+def test_get_data_with_id_reads_raw_lines_through_the_index(dataset):
+    activity = IbkrActivity(dataset["activity"], YEAR, use_cache=False)
+    for name in activity.sections:
+        assert_frame_equal(IbkrActivity.get_data_with_id(activity.raw_lines, name), activity.section(name))
+
+
+def test_get_data_with_id_parses_other_lines(dataset):
+    activity = IbkrActivity(dataset["activity"], YEAR, use_cache=False)
+    name = "Financial Instrument Information"
+    lines = list(activity.raw_lines)
+    assert_frame_equal(IbkrActivity.get_data_with_id(lines, name), activity.section(name))
@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.importtime import BUDGETS_MS, check
+
+
+@pytest.mark.parametrize(("module", "budget_ms"), BUDGETS_MS.items())
+def test_import_budget(module, budget_ms):
+    # Imported in a fresh interpreter, so the modules already imported by the tests do not count
+    _, violations = check(module, budget_ms, top=0)
+    assert violations == []
@@ -0,0 +1,42 @@
+import polars as pl
+
+from modelo720.model.instruments import InstrumentIndex
+from modelo720.model.references import OPTION_PRODUCT_PATTERN
+
+HOLDINGS = pl.DataFrame(
+    {
+        "product": ["NVIDIA CORP", "VANGUARD FTSE ALL-WORLD", "EIB 2.75% 2030", "TSLA 17JAN25 300 P", "CALL WARRANT"],
+        "isin": ["US67066G1040", "IE00BK5BQT80", "XS2314659447", "US88160R1014", "DE000XYZ1234"],
+    }
+)
+INDEX = pl.DataFrame({"isin": ["IE00BK5BQT80", "DE000XYZ1234"], "asset_class": ["etf", "warrant"]})
+
+
+def _keys(df: pl.DataFrame) -> dict[str, str]:
+    return {isin: f"{key}{subkey}" for isin, key, subkey in df.select(["isin", "key", "subkey"]).iter_rows()}
+
+
+def test_classify():
+    keys = _keys(InstrumentIndex(INDEX).classify(HOLDINGS))
+    assert keys == {"US67066G1040": "V1", "IE00BK5BQT80": "I0", "XS2314659447": "V2", "US88160R1014": "V1"}
+
+
+def test_classify_with_product_pattern():
+    index = InstrumentIndex(INDEX, product_pattern=OPTION_PRODUCT_PATTERN)
+    classified = index.classify(HOLDINGS.lazy()).collect()
+    assert classified.columns == [*HOLDINGS.columns, "key", "subkey"]
+    assert "US88160R1014" not in _keys(classified)
+
+
+def test_merge_overrides_and_keeps_the_product_pattern():
+    stock = InstrumentIndex(pl.DataFrame({"isin": ["IE00BK5BQT80"], "asset_class": ["stock"]}))
+    merged = InstrumentIndex(INDEX, product_pattern=OPTION_PRODUCT_PATTERN).merge(stock)
+    assert merged.product_pattern == OPTION_PRODUCT_PATTERN
+    assert len(merged) == 2
+    assert _keys(merged.classify(HOLDINGS))["IE00BK5BQT80"] == "V1"
+
+
+def test_save_and_load(tmp_path):
+    index = InstrumentIndex(INDEX)
+    index.save(tmp_path / "instruments.arrow")
+    assert InstrumentIndex.load(tmp_path / "instruments.arrow").frame.equals(index.frame)
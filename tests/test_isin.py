@@ -0,0 +1,55 @@
+import polars as pl
+import pytest
+
+from modelo720.model.isin import REJECT_REASON, normalize_isin, split_invalid_isins, with_isin_errors
+
+VALID = [
+    "US0378331005",
+    "US67066G1040",
+    "US88160R1014",
+    "IE00B4L5Y983",
+    "ES0113900J37",
+    "DE0007164600",
+    "GB0002634946",
+    "NL0010273215",
+    "FR0000131104",
+    "JP3633400001",
+    "CH0012032048",
+    "XS2314659447",
+]
+INVALID = {
+    "US037833100": "length",
+    "US03783310055": "length",
+    "US037833-005": "charset",
+    "US0378331O05": "check digit",
+    "-S0378331005": "charset",
+    "+S0378331005": "country",
+    "ZZ0378331005": "country",
+    "US0378331006": "check digit",
+    "US0378331X05": "check digit",
+    "IE00B4L5Y98A": "charset",
+}
+
+
+def test_valid_isins():
+    checked = with_isin_errors(pl.DataFrame({"isin": VALID}))
+    assert checked[REJECT_REASON].to_list() == [None] * len(VALID)
+
+
+@pytest.mark.parametrize(("isin", "reason"), INVALID.items())
+def test_invalid_isins(isin, reason):
+    checked = with_isin_errors(pl.DataFrame({"isin": [isin]}))
+    assert checked[REJECT_REASON].item() == reason
+
+
+def test_lazy_frames_stay_lazy():
+    checked = with_isin_errors(pl.LazyFrame({"code": VALID}), col="code")
+    assert isinstance(checked, pl.LazyFrame)
+    assert checked.collect().columns == ["code", REJECT_REASON]
+
+
+def test_normalize_then_split():
+    df = pl.DataFrame({"isin": [" us0378331005 ", "US0378331006", "   ", "IE00B4L5Y983"], "amount": [1, 2, 3, 4]})
+    holdings, rejects = split_invalid_isins(df.with_columns(normalize_isin()).drop_nulls("isin"))
+    assert holdings.to_dict(as_series=False) == {"isin": ["US0378331005", "IE00B4L5Y983"], "amount": [1, 4]}
+    assert rejects[REJECT_REASON].to_list() == ["check digit"]
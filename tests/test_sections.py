@@ -0,0 +1,90 @@
+import csv
+import io
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from modelo720.ibkr.sections import SectionIndex, parse_lines, parse_section
+
+STATEMENT = (
+    "﻿Statement,Header,Field Name,Field Value\r\n"
+    "Statement,Data,BrokerName,Interactive Brokers Ireland Limited\r\n"
+    "Trades,Header,DataDiscriminator,Asset Category,Currency,Symbol,Date/Time,Quantity,T. Price,Proceeds\r\n"
+    'Trades,Data,Order,Stocks,USD,NVDA,"2024-06-10, 10:30:00","1,020",120.5,-2410\r\n'
+    'Trades,Data,Order,Stocks,USD,TSLA,"2024-03-04, 15:20:01",-3,180.2,540.6\r\n'
+    "Trades,SubTotal,,Stocks,USD,TSLA,,-3,,540.6\r\n"
+    "Financial Instrument Information,Header,Asset Category,Symbol,Description,Security ID,Listing Exch\r\n"
+    "Financial Instrument Information,Data,Stocks,NVDA,NVIDIA CORP,US67066G1040,NASDAQ\r\n"
+    "Trades,Header,DataDiscriminator,Asset Category,Currency,Symbol,Date/Time,Quantity,T. Price\r\n"
+    'Trades,Data,Order,Forex,EUR,EUR.USD,"2024-01-02, 09:00:00",-1000,1.0945\r\n'
+    "Financial Instrument Information,Data,Stocks,TSLA,TESLA INC,US88160R1014,NASDAQ"
+)
+
+
+def _full_parse(text: str, name: str) -> pl.DataFrame:
+    """Parses a section by splitting the whole statement line by line, as a reference."""
+    blocks: list[list[str]] = []
+    last_block: dict[str, list[str]] = {}
+    for line in text.lstrip("﻿").splitlines():
+        fields = next(csv.reader([line]))
+        if len(fields) < 2:
+            continue
+        if fields[1] == "Header":
+            last_block[fields[0]] = [line]
+            if fields[0] == name:
+                blocks.append(last_block[fields[0]])
+        elif fields[0] in last_block:
+            last_block[fields[0]].append(line)
+    frames = [
+        parse_section(
+            pl.read_csv(io.StringIO("\n".join(block) + "\n"), infer_schema=False, truncate_ragged_lines=True), name
+        )
+        for block in blocks
+    ]
+    return pl.concat(frames, how="diagonal") if len(frames) > 1 else frames[0]
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 64, 1 << 20])
+@pytest.mark.parametrize("name", ["Statement", "Trades", "Financial Instrument Information"])
+def test_read_equals_full_parse(tmp_path, name, chunk_size):
+    file_path = tmp_path / "activity.csv"
+    file_path.write_bytes(STATEMENT.encode())
+    assert_frame_equal(SectionIndex(file_path).read(name, chunk_size), _full_parse(STATEMENT, name))
+
+
+@pytest.mark.parametrize("chunk_size", [None, 256])
+def test_read_generated_statement(dataset, chunk_size):
+    index = SectionIndex(dataset["activity"])
+    text = dataset["activity"].read_text(encoding="utf-8")
+    assert index.names
+    for name in index.names:
+        assert_frame_equal(index.read(name, chunk_size), _full_parse(text, name))
+
+
+def test_read_parses_numbers_and_dates(tmp_path):
+    file_path = tmp_path / "activity.csv"
+    file_path.write_bytes(STATEMENT.encode())
+    trades = SectionIndex(file_path).read("Trades")
+    assert trades["Quantity"].to_list() == [1020.0, -3.0, -3.0, -1000.0]
+    assert trades["Date/Time"].dtype == pl.Datetime
+
+
+def test_read_unknown_section(tmp_path):
+    file_path = tmp_path / "activity.csv"
+    file_path.write_bytes(STATEMENT.encode())
+    with pytest.raises(ValueError, match="not found"):
+        SectionIndex(file_path).read("Dividends")
+
+
+@pytest.mark.parametrize("name", ["Statement", "Financial Instrument Information"])
+def test_parse_lines_equals_read(tmp_path, name):
+    file_path = tmp_path / "activity.csv"
+    file_path.write_bytes(STATEMENT.encode())
+    lines = STATEMENT.splitlines(keepends=True)
+    assert_frame_equal(parse_lines(lines, name), SectionIndex(file_path).read(name))
+
+
+def test_parse_lines_unknown_section():
+    with pytest.raises(ValueError, match="not found"):
+        parse_lines(STATEMENT.splitlines(), "Dividends")
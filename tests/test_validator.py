@@ -0,0 +1,103 @@
+import pytest
+
+from modelo720.model.references import HEADER_LAYOUT, RECORD_ENCODING, RECORD_LENGTH, TRANSACTION_LAYOUT
+from modelo720.model.validator import validate_file, validate_records
+
+
+@pytest.fixture(scope="module")
+def records(compute) -> list[str]:
+    return compute.records().to_list()
+
+
+def _replace(record: str, layout: dict, field: str, value: str) -> str:
+    start, length, _ = layout[field]
+    assert len(value) == length
+    return record[: start - 1] + value + record[start - 1 + length :]
+
+
+def _errors(records: list[str]) -> set[tuple[int, str, str]]:
+    return {(row["record"], row["field"], row["error"]) for row in validate_records(records).iter_rows(named=True)}
+
+
+def test_valid_records(records):
+    assert validate_records(records).is_empty()
+
+
+@pytest.mark.parametrize("field", [field for field in TRANSACTION_LAYOUT if field != "type"])
+def test_transaction_field_format(records, field):
+    records = list(records)
+    records[1] = _replace(records[1], TRANSACTION_LAYOUT, field, "\t" * TRANSACTION_LAYOUT[field][1])
+    assert (2, field, "invalid format") in _errors(records)
+
+
+@pytest.mark.parametrize("field", [field for field in HEADER_LAYOUT if field != "type"])
+def test_header_field_format(records, field):
+    records = list(records)
+    records[0] = _replace(records[0], HEADER_LAYOUT, field, "\t" * HEADER_LAYOUT[field][1])
+    assert (1, field, "invalid format") in _errors(records)
+
+
+@pytest.mark.parametrize(("position", "record_type"), [(0, "2"), (1, "1"), (2, "9")])
+def test_record_type(records, position, record_type):
+    records = list(records)
+    records[position] = record_type + records[position][1:]
+    expected = "record type is not 1" if position == 0 else "record type is not 2"
+    assert (position + 1, "type", expected) in _errors(records)
+
+
+def test_record_length(records):
+    records = [records[0], records[1][:-1], records[2] + " ", *records[3:]]
+    errors = _errors(records)
+    assert (2, "record", f"record length is not {RECORD_LENGTH}") in errors
+    assert (3, "record", f"record length is not {RECORD_LENGTH}") in errors
+
+
+def test_line_terminator_inside_the_record(records):
+    records = list(records)
+    records[1] = records[1][:-2] + "\r\n"
+    assert (2, "record", "line terminator inside the record") in _errors(records)
+
+
+def test_null_record(records):
+    records = [*records[:2], None, *records[3:]]
+    assert (3, "record", "record is null") in _errors(records)
+
+
+def test_invalid_isin(records):
+    records = list(records)
+    records[1] = _replace(records[1], TRANSACTION_LAYOUT, "security_id", "US0378331006")
+    assert _errors(records) == {(2, "security_id", "invalid ISIN: check digit")}
+
+
+@pytest.mark.parametrize(("field", "value"), [("year", "1999"), ("declarant_nif", "99999999R")])
+def test_declarant_differs_from_the_header(records, field, value):
+    records = list(records)
+    records[-1] = _replace(records[-1], TRANSACTION_LAYOUT, field, value)
+    errors = _errors(records)
+    assert len(errors) == 1
+    assert next(iter(errors))[:2] == (len(records), field)
+
+
+def test_records_count(records):
+    errors = _errors(records[:-1])
+    assert (1, "records", f"declares {len(records) - 1} records, the file has {len(records) - 2}") in errors
+
+
+def test_total_valuation(records):
+    records = list(records)
+    start, length, _ = TRANSACTION_LAYOUT["valuation_1"]
+    cents = int(records[1][start - 1 : start - 1 + length]) + 1000
+    records[1] = _replace(records[1], TRANSACTION_LAYOUT, "valuation_1", f"{cents:0{length}}")
+    assert [error[:2] for error in _errors(records)] == [(1, "valuation_1")]
+    assert validate_records(records, tolerance_cents=1000).is_empty()
+
+
+def test_validate_file(records, tmp_path):
+    file_path = tmp_path / "modelo720.720"
+    content = "".join(record + "\r\n" for record in records).encode(RECORD_ENCODING)
+    file_path.write_bytes(content)
+    assert validate_file(file_path).is_empty()
+
+    file_path.write_bytes(content[:-2])
+    errors = validate_file(file_path)
+    assert errors.rows() == [(len(records), "record", None, "missing line terminator")]